@@ -1,16 +1,31 @@
+import json
+
 from django.contrib import messages
+from django.contrib.admin.templatetags.admin_list import items_for_result
 from django.conf import settings as django_settings
+from django.conf.urls import patterns, url
+from django.core.exceptions import PermissionDenied
+from django.core.urlresolvers import reverse
 from django.utils.translation import ugettext_lazy as _
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.forms.util import ErrorList
 from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.template.loader import select_template
 
-from feincms.module.page.models import Page
+from feincms.admin.tree_editor import TreeEditor, ChangeList
 from feincms.module.page.modeladmins import PageAdmin as PageAdminOld
 from feincms.module.page.forms import PageAdminForm as PageAdminFormOld
 
-from .exceptions import UniqueTemplateException, \
-    FirstLevelOnlyTemplateException, NoChildrenTemplateException
+from .exceptions import BoundsException, UniqueTemplateException, \
+    FirstLevelOnlyTemplateException, NoChildrenTemplateException, \
+    MaxChildrenTemplateException, AllowedParentTemplatesException, \
+    AllowedChildTemplatesException, MaxLevelTemplateException, \
+    NavigationLevelException
+from .thumbnails import get_thumbnail
+from .metrics import timed, record_rejection, record_move_node_error
+from .validation import get_violations, get_unique_scope_fields
 
 
 def get_max_navigation_level():
@@ -30,12 +45,15 @@ def is_navigation_level_valid(level):
     return not max_level or max_level >= level
 
 
-def check_template(model, template, instance=None, parent=None):
+@timed('check_template')
+def check_template(model, template, instance=None, parent=None, scope=None):
     """
     Checks that the template 'template' is valid, throws the following
     exceptions otherwise:
      * UniqueTemplateException: if 'template' is defined as unique and it
-        has been used already somewhere else
+        has been used already somewhere else (in the same scope, that is
+        with the same values of the fields in its unique_per, taken from
+        'scope' or 'instance')
      * FirstLevelOnlyTemplateException: if 'template' is defined as
         first-level-only and the user is trying to use it in a level of
         navigation > 1
@@ -43,51 +61,137 @@ def check_template(model, template, instance=None, parent=None):
         child of a page defined as no-children template or he's trying to
         change the template of this instance to no-children but the contains
         already some children.
+     * AllowedParentTemplatesException, AllowedChildTemplatesException: if
+        the template of the parent or of the subpages is not allowed
+     * MaxChildrenTemplateException: if the parent or this instance would
+        have more subpages than their max_children
+     * MaxLevelTemplateException: if 'template' is used in a level of
+        navigation > its max_level
     """
-    def get_parent(parent):
-        if not parent:
-            return None
-        if isinstance(parent, Page):
-            return parent
-        return Page.objects.get(id=parent)
-
-    if template.unique:
-        unique_count = model.objects.filter(
-            template_key=template.key
-        ).exclude(id=instance.id if instance else -1).count()
-
-        if unique_count:
-            raise UniqueTemplateException()
-
-    parent_page = get_parent(parent)
-    if parent_page:
-        if template.first_level_only:
-            raise FirstLevelOnlyTemplateException()
-
-        if model._feincms_templates[parent_page.template_key].no_children:
-            raise NoChildrenTemplateException()
-
-    if instance and template.no_children and instance.children.count():
-        raise NoChildrenTemplateException()
+    violations = get_violations(
+        model, [(template, instance, parent)], scope=scope
+    )[0]
+    if violations:
+        record_rejection(violations[0].rule, template.key)
+        raise violations[0]
 
 
-def is_template_valid(model, template, instance=None, parent=None):
+def is_template_valid(
+    model, template, instance=None, parent=None, scope=None
+):
     """
     @return bool: True if the 'template' can be associated to 'instance' of
         time 'model', False otherwise.
     """
     try:
-        check_template(model, template, instance=instance, parent=parent)
+        check_template(
+            model, template, instance=instance, parent=parent, scope=scope
+        )
         return True
-    except (
-        UniqueTemplateException, FirstLevelOnlyTemplateException,
-        NoChildrenTemplateException
-    ):
+    except BoundsException:
         pass
 
     return False
 
 
+@timed('get_valid_templates')
+def get_valid_templates(model, instance=None, parent=None, scope=None):
+    """
+    @return dict: dict containing all the templates valid for 'instance' of
+        type 'model' (excluding unique ones already used etc.), checked all
+        together with a fixed number of queries.
+    """
+    templates = model._feincms_templates.values()
+    violations = get_violations(
+        model, [(template, instance, parent) for template in templates],
+        scope=scope
+    )
+
+    return dict(
+        (template.key, template)
+        for template, exceptions in zip(templates, violations)
+        if not exceptions
+    )
+
+
+def get_change_url(model, page_id):
+    """
+    @return str: url of the admin change page of the page 'page_id'.
+    """
+    return reverse('admin:%s_%s_change' % (
+        model._meta.app_label, model._meta.module_name
+    ), args=[page_id])
+
+
+def get_violation_data(model, exception):
+    """
+    @return dict: the violation described by 'exception', serializable as
+        JSON, including the admin url of the conflicting page.
+    """
+    data = exception.as_dict()
+    if data['page']:
+        data['page']['url'] = get_change_url(model, exception.page_id)
+    return data
+
+
+def get_subpages_bounds(model, pages):
+    """
+    @return dict: page id -> dict with 'can_add_children',
+        'allowed_templates' (keys of the templates valid for a new subpage)
+        and 'violations' (template key -> violations of the other templates)
+        of each page in 'pages', checked all together with a fixed number
+        of queries.
+    """
+    templates = model._feincms_templates.values()
+    violations = iter(get_violations(
+        model, [
+            (template, None, page) for page in pages for template in templates
+        ], max_level=get_max_navigation_level()
+    ))
+
+    bounds = {}
+    for page in pages:
+        allowed = []
+        rejected = {}
+        for template in templates:
+            exceptions = next(violations)
+            if exceptions:
+                rejected[template.key] = [
+                    get_violation_data(model, exception)
+                    for exception in exceptions
+                ]
+            else:
+                allowed.append(template.key)
+        bounds[page.pk] = {
+            'can_add_children': bool(allowed),
+            'allowed_templates': allowed,
+            'violations': rejected,
+        }
+    return bounds
+
+
+def get_lazy_tree_structure(model, levels):
+    """
+    @return tuple: (tree_structure, lazy_nodes) where tree_structure is the
+        same as feincms.admin.tree_editor._build_tree_structure but limited
+        to the first 'levels' levels of navigation and lazy_nodes is the
+        list of the ids of the pages whose subpages haven't been included.
+    """
+    tree_structure = {}
+    lazy_nodes = []
+    for pk, parent_id, level, lft, rght in model.objects.filter(
+        level__lt=levels
+    ).order_by('tree_id', 'lft').values_list(
+        'pk', 'parent', 'level', 'lft', 'rght'
+    ):
+        tree_structure.setdefault(pk, [])
+        if parent_id:
+            tree_structure.setdefault(parent_id, []).append(pk)
+        if level == levels - 1 and rght - lft > 1:
+            lazy_nodes.append(pk)
+    return tree_structure, lazy_nodes
+
+
 class PageAdminForm(PageAdminFormOld):
     """
     Overridden version of feincms.module.page.forms.PageAdminForm which
@@ -100,11 +204,28 @@ class PageAdminForm(PageAdminFormOld):
         parent = kwargs.get('initial', {}).get('parent')
         if not parent and instance:
             parent = instance.parent
-        templates = self.get_valid_templates(instance, parent)
+        # scope from the submitted data, then the initial values (e.g. the
+        # GET parameters of the add form), then the instance
+        scope = {}
+        for name in get_unique_scope_fields(self.Meta.model):
+            value = self.data.get(self.add_prefix(name)) or \
+                self.initial.get(name)
+            if value:
+                scope[name] = value
+        templates = self.get_valid_templates(instance, parent, scope=scope)
 
         choices = []
         for key, template in templates.items():
-            if template.preview_image:
+            thumbnail = get_thumbnail(template)
+            if thumbnail:
+                link = mark_safe(
+                    u'<img src="%s" width="%d" height="%d" alt="%s" /> %s' % (
+                        thumbnail + (template.key, template.title)
+                    )
+                )
+
+                choices.append((template.key, link))
+            elif template.preview_image:
                 link = mark_safe(
                     u'<img src="%s" alt="%s" /> %s' % (
                         template.preview_image, template.key, template.title
@@ -135,19 +256,49 @@ class PageAdminForm(PageAdminFormOld):
             template = self.Meta.model._feincms_templates[template_key]
 
             parent_error = None
+            scope = dict(
+                (name, cleaned_data[name])
+                for name in get_unique_scope_fields(self.Meta.model)
+                if cleaned_data.get(name)
+            )
+
             try:
                 check_template(
                     self.Meta.model, template,
-                    instance=self.instance, parent=parent
+                    instance=self.instance, parent=parent, scope=scope
                 )
-            except UniqueTemplateException:
+            except UniqueTemplateException as e:
                 parent_error = _('Template already used somewhere else')
+                if e.page_id:
+                    parent_error = format_html(
+                        u'{0} <a href="{1}">{2}</a>',
+                        _('Template already used by'),
+                        get_change_url(self.Meta.model, e.page_id),
+                        e.page_title
+                    )
             except FirstLevelOnlyTemplateException:
                 parent_error = _("This template can't be used as a subpage")
             except NoChildrenTemplateException:
                 parent_error = _("This parent page can't have subpages")
+            except MaxChildrenTemplateException:
+                parent_error = _("This parent page can't have more subpages")
+            except (
+                AllowedParentTemplatesException,
+                AllowedChildTemplatesException
+            ):
+                parent_error = _(
+                    "This template can't be used under this parent page"
+                )
+            except MaxLevelTemplateException:
+                parent_error = _(
+                    "Only %d levels allowed for this template" %
+                    template.max_level
+                )
             else:
                 if not is_navigation_level_valid(parent.level+2):
+                    record_rejection(
+                        NavigationLevelException.rule, template_key
+                    )
                     parent_error = _(
                         "Only %d levels allowed" % get_max_navigation_level()
                     )
@@ -157,30 +308,191 @@ class PageAdminForm(PageAdminFormOld):
                 del cleaned_data['parent']
         return cleaned_data
 
-    def get_valid_templates(self, instance=None, parent=None):
+    def get_valid_templates(self, instance=None, parent=None, scope=None):
         """
         @return dict: dict containing all the templates valid for this instance
             (excluding unique ones already used etc.)
         """
-        templates = self.Meta.model._feincms_templates.copy()
+        return get_valid_templates(
+            self.Meta.model, instance=instance, parent=parent, scope=scope
+        )
+
+
+class BoundsChangeList(ChangeList):
+    """
+    Tree editor ChangeList which computes the bounds state of the
+    pages listed.
+    """
+    def get_results(self, request):
+        super(BoundsChangeList, self).get_results(request)
 
-        return dict(
-            filter(
-                lambda (key, template): is_template_valid(
-                    self.Meta.model, template, instance=instance, parent=parent
-                ), templates.items()
+        bounds = get_subpages_bounds(self.model, self.result_list)
+        for page in self.result_list:
+            page.bounds_can_add_children = bounds[page.pk]['can_add_children']
+
+
+class LazyChangeList(BoundsChangeList):
+    """
+    Tree editor ChangeList which lists the first levels of navigation only.
+    """
+    def get_query_set(self, *args, **kwargs):
+        return super(LazyChangeList, self).get_query_set(
+            *args, **kwargs
+        ).filter(level__lt=self.model_admin.get_lazy_tree_levels())
+
+
+class SubpagesChangeList(BoundsChangeList):
+    """
+    Tree editor ChangeList which lists the subpages of 'parent' only,
+    without counting or paginating the whole tree.
+    """
+    def __init__(self, request, parent, *args, **kwargs):
+        self.parent = parent
+        super(SubpagesChangeList, self).__init__(request, *args, **kwargs)
+
+    def get_query_set(self, *args, **kwargs):
+        return self.root_query_set.filter(
+            parent=self.parent
+        ).order_by('tree_id', 'lft')
+
+    def get_results(self, request):
+        self.result_list = list(self.query_set)
+        self.result_count = self.full_result_count = len(self.result_list)
+        self.can_show_all = True
+        self.multi_page = False
+        self.paginator = None
+
+        for page in self.result_list:
+            page.feincms_editable = self.model_admin.has_change_permission(
+                request, page
             )
-        )
+
+        bounds = get_subpages_bounds(self.model, self.result_list)
+        for page in self.result_list:
+            page.bounds_can_add_children = bounds[page.pk]['can_add_children']
+        self.subpages_bounds = bounds
 
 
 class PageAdmin(PageAdminOld):
     """
     Overridden version of feincms.module.page.models.PageAdmin which
     uses a custom version of PageAdminForm.
+
+    If lazy_tree_levels (or settings.FEINCMS_BOUNDS_LAZY_TREE_LEVELS) is set,
+    the tree editor lists only that many levels of navigation and loads the
+    subpages of a page when it is expanded.
     """
     form = PageAdminForm
+    lazy_tree_levels = None
+
+    def __init__(self, *args, **kwargs):
+        super(PageAdmin, self).__init__(*args, **kwargs)
+
+        # the feincms-bounds template extends the one chosen by TreeEditor
+        self.base_change_list_template = self.change_list_template
+        self.change_list_template = 'admin/feincms_bounds/tree_editor.html'
+
+    def get_lazy_tree_levels(self):
+        return self.lazy_tree_levels or getattr(
+            django_settings, 'FEINCMS_BOUNDS_LAZY_TREE_LEVELS', None
+        )
+
+    def is_lazy(self, request):
+        """
+        @return bool: True if the tree editor should list only the first
+            levels of navigation. Filtered or searched lists are complete.
+        """
+        return bool(self.get_lazy_tree_levels() and not request.GET)
+
+    def get_changelist(self, request, **kwargs):
+        if self.is_lazy(request):
+            return LazyChangeList
+        return BoundsChangeList
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.module_name
+        return patterns('',
+            url(r'^(\d+)/subpages/$',
+                self.admin_site.admin_view(self.subpages_view),
+                name='%s_%s_subpages' % info),
+        ) + super(PageAdmin, self).get_urls()
+
+    def changelist_view(self, request, extra_context=None, *args, **kwargs):
+        """
+        In lazy mode, builds the tree structure of the listed pages only.
+        """
+        extra_context = extra_context or {}
+        extra_context['base_change_list_template'] = select_template(
+            self.base_change_list_template
+        )
+
+        if request.is_ajax() or not self.is_lazy(request):
+            return super(PageAdmin, self).changelist_view(
+                request, extra_context, *args, **kwargs
+            )
+
+        if 'actions_column' not in self.list_display:
+            self.list_display.append('actions_column')
+        self._refresh_changelist_caches()
+
+        tree_structure, lazy_nodes = get_lazy_tree_structure(
+            self.model, self.get_lazy_tree_levels()
+        )
+        extra_context['tree_structure'] = mark_safe(json.dumps(tree_structure))
+        extra_context['lazy_nodes'] = mark_safe(json.dumps(lazy_nodes))
+
+        # skip TreeEditor.changelist_view which builds the whole tree
+        return super(TreeEditor, self).changelist_view(
+            request, extra_context, *args, **kwargs
+        )
+
+    def subpages_view(self, request, object_id):
+        """
+        Returns the changelist rows of the subpages of the page 'object_id'
+        together with their bounds state as JSON.
+        """
+        if not self.has_change_permission(request, None):
+            raise PermissionDenied
+        parent = get_object_or_404(self.queryset(request), pk=object_id)
+
+        if 'actions_column' not in self.list_display:
+            self.list_display.append('actions_column')
+        list_display = self.get_list_display(request)
+        list_display_links = self.get_list_display_links(request, list_display)
+        if self.get_actions(request):
+            list_display = ['action_checkbox'] + list(list_display)
+
+        cl = SubpagesChangeList(
+            request, parent, self.model, list_display, list_display_links,
+            self.get_list_filter(request), self.date_hierarchy,
+            self.search_fields, self.list_select_related, self.list_per_page,
+            self.list_max_show_all, self.list_editable, self
+        )
+
+        return HttpResponse(json.dumps({
+            'rows': [
+                u'<tr>%s</tr>' % u''.join(items_for_result(cl, page, None))
+                for page in cl.result_list
+            ],
+            'subpages': [page.pk for page in cl.result_list],
+            'lazy_nodes': [
+                page.pk for page in cl.result_list
+                if page.rght - page.lft > 1
+            ],
+            'bounds': cl.subpages_bounds,
+        }), content_type='application/json')
 
     def _move_node(self, request):
+        """
+        Counts the unexpected errors raised while moving the pages around.
+        """
+        try:
+            return self._check_and_move_node(request)
+        except Exception:
+            record_move_node_error()
+            raise
+
+    def _check_and_move_node(self, request):
         """
         Checks for validation before moving the pages around.
         """
@@ -205,12 +517,38 @@ class PageAdmin(PageAdminOld):
                 msg = unicode(_(u"This page can't have subpages"))
                 messages.error(request, msg)
                 return HttpResponse(msg)
+            except MaxChildrenTemplateException:
+                msg = unicode(_(u"This page can't have more subpages"))
+                messages.error(request, msg)
+                return HttpResponse(msg)
+            except (
+                AllowedParentTemplatesException,
+                AllowedChildTemplatesException
+            ):
+                msg = unicode(_(u"This page can't be moved here."))
+                messages.error(request, msg)
+                return HttpResponse(msg)
+            except MaxLevelTemplateException:
+                msg = unicode(_(
+                    u"Only %d levels allowed for this page" %
+                    cut_item_template.max_level
+                ))
+                messages.error(request, msg)
+                return HttpResponse(msg)
+            except BoundsException:
+                msg = unicode(_(u"This page can't be moved here."))
+                messages.error(request, msg)
+                return HttpResponse(msg)
             except:
+                record_move_node_error()
                 msg = unicode(_(u"Server Error."))
                 messages.error(request, msg)
                 return HttpResponse(msg)
             else:
                 if parent and not is_navigation_level_valid(parent.level+2):
+                    record_rejection(
+                        NavigationLevelException.rule, cut_item.template_key
+                    )
                     msg = unicode(
                         _(u"Only %d levels allowed" % get_max_navigation_level())
                     )
@@ -226,10 +564,14 @@ class PageAdmin(PageAdminOld):
         actions = super(PageAdmin, self)._actions_column(page)
 
         template = self.model._feincms_templates.get(page.template_key)
-        no_children = template and template.no_children
+        no_children = template and (
+            template.no_children or template.max_children == 0
+        )
         valid_navigation = is_navigation_level_valid(page.level+2)
+        can_add_children = getattr(page, 'bounds_can_add_children', True)
 
         feincms_editable = getattr(page, 'feincms_editable', True)
-        if (no_children or not valid_navigation) and feincms_editable:
+        if (no_children or not valid_navigation or not can_add_children) \
+                and feincms_editable:
             actions[1] = u'<img src="%sfeincms_bounds/img/actions_placeholder.gif">' % django_settings.STATIC_URL
         return actions
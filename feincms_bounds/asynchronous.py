@@ -0,0 +1,269 @@
+"""
+Asynchronous versions of feincms_bounds.admin.check_template and
+get_valid_templates, for servers which can't wait on the database (e.g.
+event loop based ones).
+
+The checks are queued and validated by a single worker thread, all the
+pending ones together: each batch is validated with the same fixed number
+of queries as a single synchronous call, however many templates and pages
+are checked.
+"""
+import logging
+import Queue
+import threading
+from multiprocessing import TimeoutError
+
+from django.db import close_connection
+
+from .metrics import timed, record_rejection
+from .validation import get_violations
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_worker = [None]
+
+
+class Result(object):
+    """
+    Result of an asynchronous check, available once the worker has
+    validated it.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._event = threading.Event()
+        self._callbacks = []
+        self._value = None
+        self._exception = None
+
+    def ready(self):
+        return self._event.is_set()
+
+    def successful(self):
+        """
+        @return bool: True if the check didn't raise any exception.
+        """
+        if not self.ready():
+            raise ValueError('Result not ready')
+        return self._exception is None
+
+    def wait(self, timeout=None):
+        """
+        Waits until the result is available or 'timeout' seconds have passed.
+
+        @return bool: True if the result is available.
+        """
+        self._event.wait(timeout)
+        return self.ready()
+
+    def get(self, timeout=None):
+        """
+        @return: the value of the check, raising its exception if it failed
+            or multiprocessing.TimeoutError if it's not available after
+            'timeout' seconds.
+        """
+        if not self.wait(timeout):
+            raise TimeoutError
+        if self._exception is not None:
+            raise self._exception
+        return self._value
+
+    def add_callback(self, callback):
+        """
+        Calls 'callback' with this result once it's available, from the
+        worker thread (or right away if it's available already), e.g. to
+        wake up an event loop in a thread-safe way. Exceptions raised by
+        'callback' are logged.
+        """
+        with self._lock:
+            if not self.ready():
+                self._callbacks.append(callback)
+                return
+        self._call(callback)
+
+    def set(self, value=None, exception=None):
+        with self._lock:
+            self._value = value
+            self._exception = exception
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            self._call(callback)
+
+    def _call(self, callback):
+        try:
+            callback(self)
+        except Exception:
+            logger.exception('Error in the callback %r', callback)
+
+
+class TemplateCheck(object):
+    """
+    Asynchronous check_template: the result fails with the exception
+    check_template would raise.
+    """
+    def __init__(
+        self, model, template, instance=None, parent=None, scope=None
+    ):
+        self.model = model
+        self.scope = scope or {}
+        self.template = template
+        self.candidates = [(template, instance, parent)]
+        self.result = Result()
+
+    def finish(self, violations):
+        exceptions = violations[0]
+        if exceptions:
+            record_rejection(exceptions[0].rule, self.template.key)
+            self.result.set(exception=exceptions[0])
+        else:
+            self.result.set()
+
+
+class ValidTemplatesCheck(object):
+    """
+    Asynchronous get_valid_templates: the result is the same dict.
+    """
+    def __init__(self, model, instance=None, parent=None, scope=None):
+        self.model = model
+        self.scope = scope or {}
+        self.templates = model._feincms_templates.values()
+        self.candidates = [
+            (template, instance, parent) for template in self.templates
+        ]
+        self.result = Result()
+
+    def finish(self, violations):
+        self.result.set(dict(
+            (template.key, template)
+            for template, exceptions in zip(self.templates, violations)
+            if not exceptions
+        ))
+
+
+@timed('validate_checks')
+def validate_checks(checks):
+    """
+    Validates 'checks' with one get_violations call for each distinct
+    model and scope, and sets their results.
+    """
+    groups = []
+    for check in checks:
+        for model, scope, group in groups:
+            if model is check.model and scope == check.scope:
+                group.append(check)
+                break
+        else:
+            groups.append((check.model, check.scope, [check]))
+
+    for model, scope, group in groups:
+        try:
+            violations = get_violations(model, [
+                candidate for check in group for candidate in check.candidates
+            ], scope=scope)
+        except Exception as e:
+            for check in group:
+                check.result.set(exception=e)
+            continue
+
+        start = 0
+        for check in group:
+            end = start + len(check.candidates)
+            try:
+                check.finish(violations[start:end])
+            except Exception as e:
+                logger.exception('Error while finishing %r', check)
+                if not check.result.ready():
+                    check.result.set(exception=e)
+            start = end
+
+
+class Worker(threading.Thread):
+    """
+    Thread validating the queued checks, all the pending ones together.
+    """
+    def __init__(self):
+        super(Worker, self).__init__(name='feincms-bounds-validation')
+        self.daemon = True
+        self.queue = Queue.Queue()
+
+    def run(self):
+        while True:
+            checks = [self.queue.get()]
+            while True:
+                try:
+                    checks.append(self.queue.get_nowait())
+                except Queue.Empty:
+                    break
+
+            stop = None in checks
+            checks = [check for check in checks if check]
+            try:
+                validate_checks(checks)
+            except Exception as e:
+                logger.exception(
+                    'Error while validating %d checks', len(checks)
+                )
+                # never leave a result unresolved
+                for check in checks:
+                    if not check.result.ready():
+                        check.result.set(exception=e)
+
+            try:
+                close_connection()
+            except Exception:
+                logger.exception('Error while closing the connections')
+            if stop:
+                return
+
+
+def get_worker():
+    """
+    @return Worker: the worker of this process, started if needed (e.g.
+        after a fork).
+    """
+    with _lock:
+        if _worker[0] is None or not _worker[0].is_alive():
+            _worker[0] = Worker()
+            _worker[0].start()
+        return _worker[0]
+
+
+def shutdown():
+    """
+    Stops the worker once the checks already queued have been validated.
+    """
+    with _lock:
+        worker, _worker[0] = _worker[0], None
+    if worker is not None and worker.is_alive():
+        worker.queue.put(None)
+        worker.join()
+
+
+def submit(check):
+    get_worker().queue.put(check)
+    return check.result
+
+
+def acheck_template(model, template, instance=None, parent=None, scope=None):
+    """
+    Asynchronous version of feincms_bounds.admin.check_template.
+
+    @return Result: its get() returns None if 'template' is valid, raises
+        the same exception as check_template otherwise.
+    """
+    return submit(TemplateCheck(
+        model, template, instance=instance, parent=parent, scope=scope
+    ))
+
+
+def aget_valid_templates(model, instance=None, parent=None, scope=None):
+    """
+    Asynchronous version of feincms_bounds.admin.get_valid_templates.
+
+    @return Result: its get() returns the same dict as get_valid_templates.
+    """
+    return submit(ValidTemplatesCheck(
+        model, instance=instance, parent=parent, scope=scope
+    ))
@@ -1,22 +1,98 @@
-class UniqueTemplateException(Exception):
+class BoundsException(Exception):
+    """
+    Base class of all the Exceptions raised when a template bound
+    is not respected.
+
+    Besides the rule, each exception describes the violation found:
+     * template_key: key of the template checked
+     * page_id, page_title: the conflicting page, that is the other page
+        using a unique template or the parent page
+     * child_ids: ids of the offending subpages
+    """
+    rule = None
+
+    def __init__(
+        self, template_key=None, page_id=None, page_title=None, child_ids=()
+    ):
+        super(BoundsException, self).__init__(template_key)
+        self.template_key = template_key
+        self.page_id = page_id
+        self.page_title = page_title
+        self.child_ids = list(child_ids)
+
+    def as_dict(self):
+        """
+        @return dict: the violation, serializable as JSON.
+        """
+        return {
+            'rule': self.rule,
+            'template': self.template_key,
+            'page': {
+                'id': self.page_id, 'title': self.page_title
+            } if self.page_id else None,
+            'children': self.child_ids,
+        }
+
+
+class UniqueTemplateException(BoundsException):
     """
     Manages Exceptions related to unique templates being
     used more than once.
     """
-    pass
+    rule = 'unique'
 
 
-class FirstLevelOnlyTemplateException(Exception):
+class FirstLevelOnlyTemplateException(BoundsException):
     """
     Manages Exceptions related to first-level-only templates
     being used in level of navigation > 1
     """
-    pass
+    rule = 'first_level_only'
 
 
-class NoChildrenTemplateException(Exception):
+class NoChildrenTemplateException(BoundsException):
     """
     Manages Exceptions related to no-children templates being
     used as children of other templates.
     """
-    pass
+    rule = 'no_children'
+
+
+class NavigationLevelException(BoundsException):
+    """
+    Manages Exceptions related to pages being deeper than the
+    max level of navigation allowed.
+    """
+    rule = 'navigation_level'
+
+
+class MaxChildrenTemplateException(BoundsException):
+    """
+    Manages Exceptions related to templates having more subpages
+    than their max_children.
+    """
+    rule = 'max_children'
+
+
+class AllowedParentTemplatesException(BoundsException):
+    """
+    Manages Exceptions related to templates being used under a parent
+    whose template is not in their allowed_parent_templates.
+    """
+    rule = 'allowed_parent_templates'
+
+
+class AllowedChildTemplatesException(BoundsException):
+    """
+    Manages Exceptions related to templates having subpages whose template
+    is not in their allowed_child_templates.
+    """
+    rule = 'allowed_child_templates'
+
+
+class MaxLevelTemplateException(BoundsException):
+    """
+    Manages Exceptions related to templates being used in a level of
+    navigation > their max_level.
+    """
+    rule = 'max_level'
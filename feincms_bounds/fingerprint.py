@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+
+
+def get_template_fingerprint(template):
+    """
+    @return str: hash of the bounds of 'template'. Plain FeinCMS templates
+        don't define any bounds.
+    """
+    bounds = getattr(template, 'get_bounds', dict)()
+    return hashlib.sha1(json.dumps(bounds, sort_keys=True)).hexdigest()
+
+
+def get_fingerprint(model):
+    """
+    @return dict: template key -> fingerprint of every template
+        registered on 'model'.
+    """
+    return dict(
+        (key, get_template_fingerprint(template))
+        for key, template in model._feincms_templates.items()
+    )
+
+
+def get_changed_template_keys(old, new):
+    """
+    @return set: keys of the templates added, removed or whose bounds have
+        changed between the fingerprints 'old' and 'new'.
+    """
+    return set(
+        key for key in set(old) | set(new) if old.get(key) != new.get(key)
+    )
+
+
+def load_fingerprint(path):
+    """
+    @return dict: fingerprint stored in 'path', empty if the file
+        doesn't exist.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_fingerprint(path, fingerprint):
+    """
+    Stores 'fingerprint' in 'path'.
+    """
+    with open(path, 'w') as f:
+        json.dump(fingerprint, f, indent=2, sort_keys=True)
@@ -0,0 +1,76 @@
+from django.db import connections, transaction, DatabaseError
+from django.db.backends.util import truncate_name
+from django.db.models.fields import FieldDoesNotExist
+
+
+def get_indexes(model):
+    """
+    @return list: (name, fields) tuples of the indexes feincms-bounds needs
+        on 'model' so that its validation queries never scan the table.
+    """
+    try:
+        model._meta.get_field_by_name('template_key')
+    except FieldDoesNotExist:
+        # register_templates hasn't been called, nothing to validate
+        return []
+
+    table = model._meta.db_table
+    indexes = [
+        ('%s_bounds_template_key' % table, ['template_key']),
+    ]
+
+    # unique templates scoped by some fields are looked up by
+    # (fields..., template_key)
+    scopes = set(
+        getattr(template, 'unique_per', ())
+        for template in model._feincms_templates.values()
+    )
+    for fields in sorted(scope for scope in scopes if scope):
+        indexes.append((
+            '%s_bounds_%s_template_key' % (table, '_'.join(fields)),
+            list(fields) + ['template_key']
+        ))
+    return indexes
+
+
+def create_index(model, name, fields, using='default'):
+    """
+    Creates the index 'name' on 'fields' of 'model' unless it exists already.
+
+    @return bool: True if the index has been created, False otherwise.
+    """
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    sql = 'CREATE INDEX %s ON %s (%s)' % (
+        qn(truncate_name(name, connection.ops.max_name_length())),
+        qn(model._meta.db_table),
+        ', '.join(
+            qn(model._meta.get_field_by_name(field)[0].column)
+            for field in fields
+        )
+    )
+
+    sid = transaction.savepoint(using=using)
+    try:
+        connection.cursor().execute(sql)
+    except DatabaseError:
+        # most likely the index exists already
+        transaction.savepoint_rollback(sid, using=using)
+        return False
+
+    transaction.savepoint_commit(sid, using=using)
+    return True
+
+
+def create_indexes(sender, **kwargs):
+    """
+    post_syncdb handler which creates the feincms-bounds indexes.
+    """
+    if sender.__name__ != 'feincms_bounds.models':
+        return
+
+    from feincms.module.page.models import Page
+
+    using = kwargs.get('db', 'default')
+    for name, fields in get_indexes(Page):
+        create_index(Page, name, fields, using=using)
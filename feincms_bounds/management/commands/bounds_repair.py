@@ -0,0 +1,122 @@
+"""
+``bounds_repair``
+-----------------
+
+``bounds_repair`` audits all the pages and fixes the bounds violations found
+applying a strategy per rule:
+ * reassign: use the fallback template instead
+ * reparent: move the page under its nearest valid ancestor
+ * unpublish: deactivate the page
+
+Nothing is changed unless --apply is given. Each page is changed at most
+once per run: the pages are audited again once the changes are applied and
+the violations left are listed, run the command again to fix them.
+"""
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand, CommandError
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.admin import get_max_navigation_level
+from feincms_bounds.repair import STRATEGIES, REASSIGN, REPARENT, \
+    plan_repairs, apply_repairs
+from feincms_bounds.validation import audit_pages
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Fix the bounds violations of the pages. Dry-run unless --apply "
+        "is given."
+    )
+
+    option_list = NoArgsCommand.option_list + (
+        make_option(
+            '--strategy', action='append', dest='strategies', default=[],
+            help='rule=strategy, strategy being one of %s. Can be repeated. '
+                 'Defaults to settings.FEINCMS_BOUNDS_REPAIR_STRATEGIES.' %
+                 ', '.join(STRATEGIES)
+        ),
+        make_option(
+            '--fallback-template', dest='fallback_template',
+            help='Key of the template used by the reassign strategy. '
+                 'Defaults to settings.FEINCMS_BOUNDS_FALLBACK_TEMPLATE.'
+        ),
+        make_option(
+            '--batch-size', dest='batch_size', type='int', default=500,
+            help='Max number of pages changed by each update query.'
+        ),
+        make_option(
+            '--apply', action='store_true', dest='apply', default=False,
+            help='Apply the changes, only list them otherwise.'
+        ),
+    )
+
+    def get_strategies(self, options):
+        if not options['strategies']:
+            return getattr(settings, 'FEINCMS_BOUNDS_REPAIR_STRATEGIES', {})
+
+        strategies = {}
+        for option in options['strategies']:
+            rule, _, strategy = option.partition('=')
+            if strategy not in STRATEGIES:
+                raise CommandError('Invalid strategy: %s' % option)
+            strategies[rule] = strategy
+        return strategies
+
+    def handle_noargs(self, **options):
+        strategies = self.get_strategies(options)
+        fallback_template = options['fallback_template'] or getattr(
+            settings, 'FEINCMS_BOUNDS_FALLBACK_TEMPLATE', None
+        )
+        if fallback_template and \
+                fallback_template not in Page._feincms_templates:
+            raise CommandError(
+                'Unknown fallback template: %s' % fallback_template
+            )
+
+        max_level = get_max_navigation_level()
+        violations = audit_pages(Page, Page.objects.all(), max_level=max_level)
+        actions, skipped = plan_repairs(
+            Page, violations, strategies,
+            fallback_template=fallback_template, max_level=max_level
+        )
+
+        for page, rule, strategy, target in actions:
+            if strategy == REASSIGN:
+                change = 'reassign to %s' % target
+            elif strategy == REPARENT:
+                change = 'reparent under %s' % (
+                    'first level' if target is None else 'page %s' % target.pk
+                )
+            else:
+                change = strategy
+            self.stdout.write(u'Page %s "%s" (%s): %s\n' % (
+                page.pk, page.title, rule, change
+            ))
+        for page, rule, reason in skipped:
+            self.stdout.write(u'Page %s "%s" (%s): skipped, %s\n' % (
+                page.pk, page.title, rule, reason
+            ))
+
+        if not options['apply']:
+            self.stdout.write(
+                '%d changes planned, run with --apply to make them.\n' %
+                len(actions)
+            )
+            return
+
+        apply_repairs(Page, actions, batch_size=options['batch_size'])
+        self.stdout.write('%d changes applied.\n' % len(actions))
+
+        remaining = audit_pages(Page, Page.objects.all(), max_level=max_level)
+        for page, exception in remaining:
+            self.stdout.write(u'Page %s "%s" (%s): still invalid\n' % (
+                page.pk, page.title, exception.rule
+            ))
+        if remaining:
+            self.stdout.write(
+                '%d violations left, run again to fix the ones which have '
+                'a strategy.\n' % len(remaining)
+            )
@@ -0,0 +1,102 @@
+"""
+``bounds_revalidate``
+---------------------
+
+``bounds_revalidate`` compares the bounds of the registered templates with
+the ones stored by its last run and re-validates only the pages affected by
+the templates whose bounds have changed.
+"""
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import NoArgsCommand, CommandError
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.admin import get_max_navigation_level
+from feincms_bounds.exceptions import UniqueTemplateException, \
+    FirstLevelOnlyTemplateException, NoChildrenTemplateException, \
+    NavigationLevelException, MaxChildrenTemplateException, \
+    AllowedParentTemplatesException, AllowedChildTemplatesException, \
+    MaxLevelTemplateException
+from feincms_bounds.fingerprint import get_fingerprint, load_fingerprint, \
+    save_fingerprint, get_changed_template_keys
+from feincms_bounds.validation import audit_pages, get_affected_pages
+
+
+MESSAGES = {
+    UniqueTemplateException: 'template already used somewhere else',
+    FirstLevelOnlyTemplateException: "template can't be used as a subpage",
+    NoChildrenTemplateException: "template or parent can't have subpages",
+    NavigationLevelException: 'deeper than the max level of navigation',
+    MaxChildrenTemplateException: 'too many subpages',
+    AllowedParentTemplatesException: 'template not allowed under its parent',
+    AllowedChildTemplatesException: 'subpage template not allowed',
+    MaxLevelTemplateException: 'deeper than the max level of its template',
+}
+
+
+class Command(NoArgsCommand):
+    help = (
+        "Re-validate the pages affected by the templates whose bounds have "
+        "changed since the last run."
+    )
+
+    option_list = NoArgsCommand.option_list + (
+        make_option(
+            '--fingerprint-file', dest='fingerprint_file',
+            help='File storing the bounds of the templates validated last. '
+                 'Defaults to settings.FEINCMS_BOUNDS_FINGERPRINT_FILE.'
+        ),
+        make_option(
+            '--save', action='store_true', dest='save', default=False,
+            help='Store the current bounds once the pages have been checked.'
+        ),
+    )
+
+    def handle_noargs(self, **options):
+        path = options['fingerprint_file'] or getattr(
+            settings, 'FEINCMS_BOUNDS_FINGERPRINT_FILE', None
+        )
+        if not path:
+            raise CommandError(
+                'Specify --fingerprint-file or '
+                'settings.FEINCMS_BOUNDS_FINGERPRINT_FILE.'
+            )
+
+        fingerprint = get_fingerprint(Page)
+        changed_keys = get_changed_template_keys(
+            load_fingerprint(path), fingerprint
+        )
+        if not changed_keys:
+            self.stdout.write('No template bounds have changed.\n')
+            return
+
+        self.stdout.write(
+            'Templates changed: %s\n' % ', '.join(sorted(changed_keys))
+        )
+
+        pages = get_affected_pages(Page, changed_keys)
+        violations = audit_pages(
+            Page, pages, max_level=get_max_navigation_level()
+        )
+        for page, exception in violations:
+            message = MESSAGES[exception.__class__]
+            if exception.child_ids:
+                message += u', subpages %s' % ', '.join(
+                    str(pk) for pk in exception.child_ids
+                )
+            elif exception.page_id:
+                message += u', conflicting page %s "%s"' % (
+                    exception.page_id, exception.page_title
+                )
+            self.stdout.write(u'Page %s "%s" (%s): %s\n' % (
+                page.pk, page.title, page.template_key, message
+            ))
+        self.stdout.write('%d pages checked, %d violations found.\n' % (
+            len(pages), len(violations)
+        ))
+
+        if options['save']:
+            save_fingerprint(path, fingerprint)
+            self.stdout.write('Fingerprint saved to %s\n' % path)
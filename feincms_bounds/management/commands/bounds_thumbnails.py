@@ -0,0 +1,38 @@
+"""
+``bounds_thumbnails``
+---------------------
+
+``bounds_thumbnails`` creates the thumbnails of the preview images of all
+the registered templates. Run it when deploying, after collectstatic.
+"""
+from django.core.management.base import NoArgsCommand, CommandError
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.thumbnails import Image, get_thumbnail, \
+    get_thumbnail_root
+
+
+class Command(NoArgsCommand):
+    help = "Create the thumbnails of the template preview images."
+
+    def handle_noargs(self, **options):
+        if Image is None:
+            raise CommandError('PIL is required to create the thumbnails.')
+        if get_thumbnail_root() is None:
+            raise CommandError(
+                'Set settings.STATIC_ROOT or '
+                'settings.FEINCMS_BOUNDS_THUMBNAIL_ROOT.'
+            )
+
+        for key, template in Page._feincms_templates.items():
+            if not template.preview_image:
+                continue
+
+            thumbnail = get_thumbnail(template)
+            if thumbnail:
+                self.stdout.write('%s: %s (%dx%d)\n' % ((key, ) + thumbnail))
+            else:
+                self.stdout.write('%s: %s not found or invalid\n' % (
+                    key, template.preview_image
+                ))
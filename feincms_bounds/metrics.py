@@ -0,0 +1,222 @@
+"""
+In-process metrics about feincms-bounds, exported in the Prometheus text
+format by feincms_bounds.views.metrics or written to the file defined by
+settings.FEINCMS_BOUNDS_METRICS_FILE.
+"""
+import logging
+import os
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+DEFAULT_BUCKETS = (
+    .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1.0, 2.5, 5.0
+)
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_metrics = []
+_last_write = [0]
+
+
+def format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+
+def format_labels(labelnames, labels, extra=()):
+    pairs = list(zip(labelnames, labels)) + list(extra)
+    if not pairs:
+        return ''
+
+    def escape(value):
+        return unicode(value).replace('\\', r'\\').replace(
+            '\n', r'\n'
+        ).replace('"', r'\"')
+
+    return u'{%s}' % u','.join(
+        u'%s="%s"' % (name, escape(value)) for name, value in pairs
+    )
+
+
+class Counter(object):
+    """
+    Monotonically increasing value, one for each combination of labels.
+    """
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.reset()
+        _metrics.append(self)
+
+    def reset(self):
+        self.values = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        for key, value in sorted(self.values.items()):
+            yield self.name, format_labels(self.labelnames, key), value
+
+
+class Histogram(object):
+    """
+    Distribution of the observed values in cumulative buckets, one for each
+    combination of labels.
+    """
+    type = 'histogram'
+
+    def __init__(
+        self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.reset()
+        _metrics.append(self)
+
+    def reset(self):
+        # labels -> [bucket counts..., +Inf count, sum]
+        self.values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with _lock:
+            counts = self.values.setdefault(
+                key, [0] * (len(self.buckets) + 1) + [0.0]
+            )
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def samples(self):
+        for key, counts in sorted(self.values.items()):
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                yield '%s_bucket' % self.name, format_labels(
+                    self.labelnames, key, [('le', format_value(bound))]
+                ), count
+            labels = format_labels(self.labelnames, key)
+            yield '%s_count' % self.name, labels, counts[-2]
+            yield '%s_sum' % self.name, labels, counts[-1]
+
+
+REJECTIONS = Counter(
+    'feincms_bounds_rejections_total',
+    'Pages rejected because of a template bound.',
+    ('rule', 'template')
+)
+
+MOVE_NODE_ERRORS = Counter(
+    'feincms_bounds_move_node_errors_total',
+    'Unexpected errors while moving pages in the tree editor.'
+)
+
+VALIDATION_DURATION = Histogram(
+    'feincms_bounds_validation_duration_seconds',
+    'Time spent validating templates.',
+    ('function',)
+)
+
+
+def render():
+    """
+    @return unicode: all the metrics in the Prometheus text format.
+    """
+    lines = []
+    with _lock:
+        for metric in _metrics:
+            lines.append(u'# HELP %s %s' % (metric.name, metric.documentation))
+            lines.append(u'# TYPE %s %s' % (metric.name, metric.type))
+            for name, labels, value in metric.samples():
+                lines.append(u'%s%s %s' % (name, labels, format_value(value)))
+    return u'\n'.join(lines) + u'\n'
+
+
+def write(path):
+    """
+    Writes the metrics to 'path' atomically, e.g. for the textfile
+    collector of the Prometheus node exporter.
+    """
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    with open(tmp_path, 'w') as f:
+        f.write(render().encode('utf-8'))
+    os.rename(tmp_path, path)
+
+
+def write_if_needed():
+    """
+    Writes the metrics to settings.FEINCMS_BOUNDS_METRICS_FILE, if defined,
+    at most once every settings.FEINCMS_BOUNDS_METRICS_FILE_INTERVAL seconds.
+    '%(pid)s' in the path is replaced by the id of the current process.
+    Errors are logged only, exporting the metrics never breaks validation.
+    """
+    path = getattr(settings, 'FEINCMS_BOUNDS_METRICS_FILE', None)
+    if not path:
+        return
+
+    now = time.time()
+    interval = getattr(settings, 'FEINCMS_BOUNDS_METRICS_FILE_INTERVAL', 10)
+    if now - _last_write[0] < interval:
+        return
+    _last_write[0] = now
+
+    path = path % {'pid': os.getpid()}
+    try:
+        write(path)
+    except (IOError, OSError):
+        logger.exception('Unable to write the metrics to %s', path)
+
+
+def reset():
+    """
+    Resets all the metrics.
+    """
+    with _lock:
+        for metric in _metrics:
+            metric.reset()
+
+
+def record_rejection(rule, template_key):
+    REJECTIONS.inc(rule=rule, template=template_key)
+    write_if_needed()
+
+
+def record_move_node_error():
+    MOVE_NODE_ERRORS.inc()
+    write_if_needed()
+
+
+def timed(function):
+    """
+    Decorator which observes the duration of each call in
+    VALIDATION_DURATION labelled with 'function'.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                VALIDATION_DURATION.observe(
+                    time.time() - start, function=function
+                )
+                write_if_needed()
+        return wrapper
+    return decorator
@@ -1,18 +1,56 @@
+from django.db.models import signals
+
 from feincms.models import Template as FeinCMSTemplate
 
+from .indexes import create_indexes
+
 
 class Template(FeinCMSTemplate):
     """
     Custom version of feincms.models.Template which adds support for
-    unique, first-level-only and no-children properties.
+    unique, first-level-only and no-children properties and for:
+     * unique_per: names of the fields unique templates are scoped by,
+        e.g. ('site', 'language') for one home page per site and language
+     * max_children: max number of subpages
+     * allowed_parent_templates: keys of the templates allowed as parent
+     * allowed_child_templates: keys of the templates allowed as subpages
+     * max_level: max level of navigation the template can be used in
     """
+    bounds = (
+        'unique', 'unique_per', 'first_level_only', 'no_children',
+        'max_children', 'allowed_parent_templates', 'allowed_child_templates',
+        'max_level'
+    )
+
     def __init__(
         self, title, path, regions, key=None, preview_image=None, unique=False,
-        first_level_only=False, no_children=False
+        first_level_only=False, no_children=False, max_children=None,
+        allowed_parent_templates=None, allowed_child_templates=None,
+        max_level=None, unique_per=None
     ):
         super(Template, self).__init__(
             title, path, regions, key=key, preview_image=preview_image
         )
-        self.unique = unique
+        self.unique = unique or bool(unique_per)
+        self.unique_per = tuple(unique_per or ())
         self.first_level_only = first_level_only
         self.no_children = no_children
+        self.max_children = max_children
+        self.allowed_parent_templates = None
+        if allowed_parent_templates is not None:
+            self.allowed_parent_templates = tuple(allowed_parent_templates)
+        self.allowed_child_templates = None
+        if allowed_child_templates is not None:
+            self.allowed_child_templates = tuple(allowed_child_templates)
+        self.max_level = max_level
+
+    def get_bounds(self):
+        """
+        @return dict: name -> value of every bound defined on this template.
+        """
+        return dict((name, getattr(self, name)) for name in self.bounds)
+
+
+signals.post_syncdb.connect(
+    create_indexes, dispatch_uid='feincms_bounds.create_indexes'
+)
@@ -0,0 +1,290 @@
+from django.db import connections, router, transaction
+
+from .validation import get_template, get_unique_scope, get_violations
+
+
+REASSIGN = 'reassign'
+REPARENT = 'reparent'
+UNPUBLISH = 'unpublish'
+STRATEGIES = (REASSIGN, REPARENT, UNPUBLISH)
+
+# rules which are reported both on the parent page (with the ids of the
+# offending subpages) and on its subpages: only the subpages are repaired.
+CHILDREN_RULES = ('no_children', 'allowed_child_templates', 'max_children')
+
+
+def get_ancestors(model, pages):
+    """
+    @return dict: pk -> page of all the ancestors of 'pages', fetched with
+        one query per level of navigation.
+    """
+    ancestors = {}
+    ids = set(page.parent_id for page in pages if page.parent_id)
+    while ids:
+        for page in model.objects.filter(pk__in=ids):
+            ancestors[page.pk] = page
+        ids = set(
+            page.parent_id for page in ancestors.values()
+            if page.parent_id and page.parent_id not in ancestors
+        )
+    return ancestors
+
+
+def get_offending_pages(model, violations, ancestors):
+    """
+    @return list: (page, rule) tuples of the pages that have to be changed to
+        fix 'violations', at most one per page:
+         * the first page in the tree keeps a unique template (in each
+           scope if the template is unique per some fields)
+         * the first max_children subpages of a page are kept
+         * subpages are changed, instead of their parents, for the
+           no-children, allowed-child-templates and max-children rules
+    """
+    # subpages over the max_children of their parent, as reported on it
+    over_limit = {}
+    for page, exception in violations:
+        if exception.rule == 'max_children' and exception.child_ids:
+            over_limit[page.pk] = set(exception.child_ids)
+
+    seen = set()
+    kept_unique = set()
+    kept_children = {}
+    offending = []
+
+    violations = sorted(
+        violations, key=lambda (page, e): (page.tree_id, page.lft)
+    )
+    for page, exception in violations:
+        if page.pk in seen:
+            continue
+        rule = exception.rule
+
+        if rule == 'unique':
+            scope = (page.template_key, get_unique_scope(
+                model, get_template(model, page), page
+            ))
+            if scope not in kept_unique:
+                kept_unique.add(scope)
+                continue
+
+        if rule in CHILDREN_RULES:
+            # reported on the parent page, its subpages are repaired
+            if exception.child_ids:
+                continue
+
+            parent = ancestors.get(page.parent_id)
+            parent_template = parent and get_template(model, parent)
+            if not parent_template:
+                continue
+
+            if rule == 'max_children':
+                if parent.pk in over_limit:
+                    if page.pk not in over_limit[parent.pk]:
+                        continue
+                else:
+                    # the parent hasn't been audited: keep the first ones
+                    max_children = getattr(
+                        parent_template, 'max_children', None
+                    )
+                    kept = kept_children.setdefault(parent.pk, [])
+                    if page.pk in kept:
+                        continue
+                    if max_children is None or len(kept) < max_children:
+                        kept.append(page.pk)
+                        continue
+
+        seen.add(page.pk)
+        offending.append((page, rule))
+    return offending
+
+
+def get_nearest_valid_ancestors(model, pages, ancestors, max_level=None):
+    """
+    @param pages: (page, rule) tuples.
+    @return list: for each page, its nearest ancestor (excluding its current
+        parent, None meaning the first level) under which 'rule' is
+        respected; False if there isn't any.
+    """
+    candidates = []
+    for page, rule in pages:
+        options = []
+        parent = ancestors.get(page.parent_id)
+        while parent and parent.parent_id:
+            parent = ancestors[parent.parent_id]
+            options.append(parent)
+        options.append(None)
+        candidates.append(options)
+
+    violations = iter(get_violations(model, [
+        (get_template(model, page), page, option)
+        for (page, rule), page_options in zip(pages, candidates)
+        for option in page_options
+    ], max_level=max_level))
+
+    nearest = []
+    for (page, rule), options in zip(pages, candidates):
+        found = False
+        for option in options:
+            exceptions = next(violations)
+            if found is False and \
+                    rule not in [exception.rule for exception in exceptions]:
+                found = option
+        nearest.append(found)
+    return nearest
+
+
+def plan_repairs(
+    model, violations, strategies, fallback_template=None, max_level=None
+):
+    """
+    @param violations: (page, exception) tuples as returned by audit_pages.
+    @param strategies: dict rule -> strategy, one of STRATEGIES.
+    @param fallback_template: key of the template used by REASSIGN.
+    @return tuple: (actions, skipped) where actions is a list of
+        (page, rule, strategy, target) tuples, target being the new template
+        key for REASSIGN and the new parent for REPARENT, and skipped is a
+        list of (page, rule, reason) tuples for the pages that can't be
+        repaired.
+    """
+    ancestors = get_ancestors(model, [page for page, _ in violations])
+    offending = get_offending_pages(model, violations, ancestors)
+
+    to_reparent = [
+        (page, rule) for page, rule in offending
+        if strategies.get(rule) == REPARENT
+    ]
+    nearest = dict(
+        (page.pk, ancestor) for (page, _), ancestor in zip(
+            to_reparent, get_nearest_valid_ancestors(
+                model, to_reparent, ancestors, max_level=max_level
+            )
+        )
+    )
+
+    actions = []
+    skipped = []
+    for page, rule in offending:
+        strategy = strategies.get(rule)
+        if strategy == REASSIGN:
+            if fallback_template and fallback_template != page.template_key:
+                actions.append((page, rule, strategy, fallback_template))
+            else:
+                skipped.append((page, rule, 'no fallback template'))
+        elif strategy == REPARENT:
+            if nearest[page.pk] is not False:
+                actions.append((page, rule, strategy, nearest[page.pk]))
+            else:
+                skipped.append((page, rule, 'no valid ancestor'))
+        elif strategy == UNPUBLISH:
+            actions.append((page, rule, strategy, None))
+        else:
+            skipped.append((page, rule, 'no strategy'))
+    return actions, skipped
+
+
+def update_in_batches(model, ids, batch_size, **values):
+    ids = list(ids)
+    for start in range(0, len(ids), batch_size):
+        model.objects.filter(pk__in=ids[start:start + batch_size]).update(
+            **values
+        )
+
+
+def update_cached_urls(model, tree_id, batch_size=500):
+    """
+    Updates the _cached_url of the pages of the tree 'tree_id' the same way
+    Page.save does, without saving each page: the changed urls are set with
+    one CASE update per batch.
+    """
+    urls = {}
+    changed = []
+    for pk, parent_id, slug, override_url, cached_url in model.objects.filter(
+        tree_id=tree_id
+    ).order_by('lft').values_list(
+        'pk', 'parent', 'slug', 'override_url', '_cached_url'
+    ):
+        if override_url:
+            url = override_url
+        elif not parent_id:
+            url = u'/%s/' % slug
+        else:
+            url = u'%s%s/' % (urls[parent_id], slug)
+        urls[pk] = url
+
+        if url != cached_url:
+            changed.append((pk, url))
+
+    using = router.db_for_write(model)
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    pk_column = qn(model._meta.pk.column)
+    url_column = qn(model._meta.get_field('_cached_url').column)
+
+    cursor = connection.cursor()
+    for start in range(0, len(changed), batch_size):
+        batch = changed[start:start + batch_size]
+        params = []
+        for pk, url in batch:
+            params.extend([pk, url])
+        params.extend(pk for pk, _ in batch)
+
+        cursor.execute('UPDATE %s SET %s = CASE %s %s END WHERE %s IN (%s)' % (
+            table, url_column, pk_column, ' '.join(
+                ['WHEN %s THEN %s'] * len(batch)
+            ), pk_column, ', '.join(['%s'] * len(batch))
+        ), params)
+    if changed:
+        transaction.commit_unless_managed(using=using)
+
+
+def apply_repairs(model, actions, batch_size=500):
+    """
+    Applies 'actions' as returned by plan_repairs with bulk updates, one
+    transaction per tree. Trees whose pages have been moved are rebuilt once.
+    """
+    trees = {}
+    for action in actions:
+        trees.setdefault(action[0].tree_id, []).append(action)
+
+    for tree_id, tree_actions in sorted(trees.items()):
+        with transaction.commit_on_success():
+            reassign = {}
+            reparent = {}
+            unpublish = []
+            new_roots = []
+            for page, rule, strategy, target in tree_actions:
+                if strategy == REASSIGN:
+                    reassign.setdefault(target, []).append(page.pk)
+                elif strategy == UNPUBLISH:
+                    unpublish.append(page.pk)
+                elif target is None:
+                    new_roots.append(page.pk)
+                else:
+                    reparent.setdefault(target.pk, []).append(page.pk)
+
+            for template_key, ids in reassign.items():
+                update_in_batches(
+                    model, ids, batch_size, template_key=template_key
+                )
+            update_in_batches(model, unpublish, batch_size, active=False)
+            for parent_id, ids in reparent.items():
+                update_in_batches(model, ids, batch_size, parent=parent_id)
+
+            if not (reparent or new_roots):
+                continue
+
+            new_tree_ids = []
+            for pk in new_roots:
+                new_tree_id = model._tree_manager._get_next_tree_id()
+                model.objects.filter(pk=pk).update(
+                    parent=None, tree_id=new_tree_id
+                )
+                new_tree_ids.append(new_tree_id)
+
+            for rebuilt_tree_id in [tree_id] + new_tree_ids:
+                model._tree_manager.partial_rebuild(rebuilt_tree_id)
+            for rebuilt_tree_id in [tree_id] + new_tree_ids:
+                update_cached_urls(
+                    model, rebuilt_tree_id, batch_size=batch_size
+                )
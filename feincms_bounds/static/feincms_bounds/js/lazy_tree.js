@@ -0,0 +1,50 @@
+/*
+ * Loads the subpages of the nodes listed in feincms.lazy_nodes the first
+ * time they are expanded in the tree editor.
+ */
+feincms.jQuery(function($){
+    var rlist = $('#result_list');
+    feincms.collapsed_nodes = feincms.collapsed_nodes || [];
+
+    function markLazyNodes(ids) {
+        for (var i=0; i<ids.length; ++i) {
+            feincms.tree_structure[ids[i]] = [];
+            $('#page_marker-' + ids[i])
+                .addClass('children closed lazy')
+                .click(loadSubpages);
+            if (feincms.collapsed_nodes.indexOf(ids[i]) == -1)
+                feincms.collapsed_nodes.push(ids[i]);
+        }
+    }
+
+    function loadSubpages() {
+        var marker = $(this);
+        if (!marker.hasClass('lazy'))
+            return;
+        marker.removeClass('lazy');
+
+        var row = marker.closest('tr');
+        var itemId = extract_item_id(marker.attr('id'));
+
+        $.getJSON(itemId + '/subpages/', function(data) {
+            var rows = $(data.rows.join(''));
+            rows.insertAfter(row);
+
+            feincms.tree_structure[itemId] = data.subpages;
+            for (var i=0; i<data.subpages.length; ++i)
+                feincms.tree_structure[data.subpages[i]] = [];
+
+            // rebind the drag and drop handlers of the whole tree, including
+            // the new rows
+            $('div.drag_handle', rlist).unbind('mousedown');
+            $('tbody', rlist).feinTree();
+            $('span.page_marker', rows).feinTreeToggleItem();
+            rows.attr('tabindex', -1);
+
+            markLazyNodes(data.lazy_nodes);
+            $('tbody', rlist).recolorRows();
+        });
+    }
+
+    markLazyNodes(feincms.lazy_nodes || []);
+});
@@ -0,0 +1,159 @@
+"""
+Thumbnails of the template preview images, so that the admin doesn't embed
+the full-size images in every page change form.
+
+Each thumbnail is created once and stored under a name derived from the
+content of the preview image, so it can be cached forever.
+"""
+import hashlib
+import logging
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+try:
+    from PIL import Image
+except ImportError:
+    try:
+        import Image
+    except ImportError:
+        Image = None
+
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif'}
+
+_thumbnails = {}
+
+
+def get_thumbnail_size():
+    """
+    @return tuple: max (width, height) of the thumbnails as defined by
+        settings.FEINCMS_BOUNDS_THUMBNAIL_SIZE, (120, 90) by default.
+    """
+    return tuple(
+        getattr(settings, 'FEINCMS_BOUNDS_THUMBNAIL_SIZE', (120, 90))
+    )
+
+
+def get_thumbnail_root():
+    """
+    @return str: folder where the thumbnails are stored as defined by
+        settings.FEINCMS_BOUNDS_THUMBNAIL_ROOT,
+        STATIC_ROOT/feincms_bounds/thumbnails by default. None if neither
+        is defined.
+    """
+    root = getattr(settings, 'FEINCMS_BOUNDS_THUMBNAIL_ROOT', None)
+    if root:
+        return root
+    if not settings.STATIC_ROOT:
+        return None
+    return os.path.join(settings.STATIC_ROOT, 'feincms_bounds', 'thumbnails')
+
+
+def get_thumbnail_url():
+    """
+    @return str: base url of the thumbnails as defined by
+        settings.FEINCMS_BOUNDS_THUMBNAIL_URL,
+        STATIC_URL/feincms_bounds/thumbnails/ by default.
+    """
+    url = getattr(settings, 'FEINCMS_BOUNDS_THUMBNAIL_URL', None)
+    if url:
+        return url
+    return '%sfeincms_bounds/thumbnails/' % (settings.STATIC_URL or '')
+
+
+def find_preview_image(url):
+    """
+    @return str: path of the file served at 'url' if it's a static or
+        media file, None otherwise.
+    """
+    if settings.STATIC_URL and url.startswith(settings.STATIC_URL):
+        return finders.find(url[len(settings.STATIC_URL):])
+
+    if settings.MEDIA_URL and url.startswith(settings.MEDIA_URL):
+        path = os.path.join(settings.MEDIA_ROOT, url[len(settings.MEDIA_URL):])
+        return path if os.path.exists(path) else None
+
+    if '://' not in url and not url.startswith('/'):
+        return finders.find(url)
+    return None
+
+
+def create_thumbnail(path, size):
+    """
+    Resizes the image 'path' to fit in 'size', unless it's been done already.
+
+    @return tuple: (name, width, height) of the thumbnail.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    image = Image.open(path)
+    format = image.format if image.format in FORMATS else 'PNG'
+    name = '%s.%s' % (
+        hashlib.sha1(content + repr(size)).hexdigest()[:16], FORMATS[format]
+    )
+
+    root = get_thumbnail_root()
+    thumbnail_path = os.path.join(root, name)
+    if os.path.exists(thumbnail_path):
+        return (name, ) + Image.open(thumbnail_path).size
+
+    if not os.path.isdir(root):
+        os.makedirs(root)
+
+    if format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    elif format == 'PNG' and image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA')
+    image.thumbnail(size, Image.ANTIALIAS)
+
+    # write to a temporary file first so other processes never see
+    # a partial thumbnail
+    tmp_path = '%s.%s.tmp' % (thumbnail_path, os.getpid())
+    try:
+        image.save(tmp_path, format=format)
+        os.rename(tmp_path, thumbnail_path)
+    except (IOError, OSError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return (name, ) + image.size
+
+
+def get_thumbnail(template):
+    """
+    @return tuple: (url, width, height) of the thumbnail of the preview image
+        of 'template', created if needed. None if the template has no
+        preview image, the image can't be found or read, the thumbnail can't
+        be written, no thumbnail root is defined or PIL is not installed.
+    """
+    if not template.preview_image or Image is None or \
+            get_thumbnail_root() is None:
+        return None
+
+    size = get_thumbnail_size()
+    key = (template.preview_image, size)
+    if key not in _thumbnails:
+        path = find_preview_image(template.preview_image)
+        thumbnail = None
+        if path:
+            try:
+                name, width, height = create_thumbnail(path, size)
+                thumbnail = (get_thumbnail_url() + name, width, height)
+            except (IOError, OSError):
+                logger.exception(
+                    'Unable to create the thumbnail of %s', path
+                )
+        _thumbnails[key] = thumbnail
+    return _thumbnails[key]
+
+
+def clear_cache():
+    """
+    Forgets the thumbnails looked up so far by this process.
+    """
+    _thumbnails.clear()
@@ -0,0 +1,369 @@
+from django.db import connections, router
+from django.db.models import Model, Count
+
+from .exceptions import UniqueTemplateException, \
+    FirstLevelOnlyTemplateException, NoChildrenTemplateException, \
+    NavigationLevelException, MaxChildrenTemplateException, \
+    AllowedParentTemplatesException, AllowedChildTemplatesException, \
+    MaxLevelTemplateException
+
+
+def get_template(model, page):
+    """
+    @return Template: template used by 'page', None if it's not registered.
+    """
+    return model._feincms_templates.get(page.template_key)
+
+
+def get_parents(model, parents):
+    """
+    @param parents: list of pages, page ids or None.
+    @return list: the pages in 'parents', fetching the ones given as id
+        with a single query. Raises model.DoesNotExist if any of them
+        doesn't exist.
+    """
+    pk_field = model._meta.pk
+    ids = set(
+        pk_field.to_python(parent) for parent in parents
+        if parent and not isinstance(parent, Model)
+    )
+
+    fetched = {}
+    if ids:
+        fetched = dict(
+            (page.pk, page) for page in model.objects.filter(pk__in=ids)
+        )
+        missing = ids - set(fetched)
+        if missing:
+            raise model.DoesNotExist(
+                '%s matching query does not exist: %s' % (
+                    model._meta.object_name,
+                    ', '.join(str(pk) for pk in sorted(missing))
+                )
+            )
+
+    return [
+        parent if not parent or isinstance(parent, Model)
+        else fetched.get(pk_field.to_python(parent))
+        for parent in parents
+    ]
+
+
+def get_unique_scope(model, template, instance=None, scope=None):
+    """
+    @param scope: dict field name -> value overriding the ones of 'instance'.
+    @return tuple: values, for 'instance' or for a new page if None, of the
+        fields 'template' is unique per.
+    """
+    values = []
+    for name in getattr(template, 'unique_per', ()):
+        field = model._meta.get_field(name)
+        if scope and name in scope:
+            value = scope[name]
+            if isinstance(value, Model):
+                value = value.pk
+        elif instance is not None:
+            value = getattr(instance, field.attname)
+        else:
+            value = field.get_default()
+
+        if field.rel:
+            field = field.rel.get_related_field()
+        values.append(field.to_python(value))
+    return tuple(values)
+
+
+def get_unique_scope_fields(model):
+    """
+    @return set: names of the fields any template of 'model' is unique per.
+    """
+    return set(
+        name for template in model._feincms_templates.values()
+        for name in getattr(template, 'unique_per', ())
+    )
+
+
+def get_unique_pages_queryset(model, fields, lookups):
+    """
+    @param lookups: (template key, scope) tuples, scope being the values
+        of 'fields'.
+    @return QuerySet: the first two pages, ordered by id, using each template
+        in 'lookups' in its scope. The pages before each one are counted
+        with a correlated subquery using the index on 'fields' and
+        template_key.
+    """
+    queryset = model.objects.filter(
+        template_key__in=set(template_key for template_key, _ in lookups)
+    )
+    for i, name in enumerate(fields):
+        queryset = queryset.filter(**{
+            '%s__in' % name: set(scope[i] for _, scope in lookups)
+        })
+
+    # the __in filters exclude NULL values, plain equality is enough
+    qn = connections[router.db_for_read(model)].ops.quote_name
+    table = qn(model._meta.db_table)
+    pk_column = qn(model._meta.pk.column)
+    same_group = [
+        'previous.%(c)s = %(t)s.%(c)s' % {
+            'c': qn(model._meta.get_field(name).column), 't': table
+        } for name in tuple(fields) + ('template_key', )
+    ]
+    return queryset.extra(where=[
+        '(SELECT COUNT(*) FROM %s previous WHERE %s AND '
+        'previous.%s < %s.%s) < 2' % (
+            table, ' AND '.join(same_group), pk_column, table, pk_column
+        )
+    ]).order_by('pk')
+
+
+def get_unique_pages(model, lookups):
+    """
+    @param lookups: (template key, unique_per, scope) tuples, scope being
+        the values of the fields in unique_per.
+    @return dict: (template key, scope) -> list of (id, title) of the first
+        two pages using each template in its scope ordered by id, enough to
+        find a conflicting page other than the one being checked. Fetched
+        with one query for each distinct unique_per.
+    """
+    lookups_by_fields = {}
+    for template_key, fields, scope in lookups:
+        lookups_by_fields.setdefault(fields, set()).add((template_key, scope))
+
+    pages = {}
+    for fields, lookups in lookups_by_fields.items():
+        for row in get_unique_pages_queryset(
+            model, fields, lookups
+        ).values_list('pk', 'title', 'template_key', *fields):
+            key = (row[2], tuple(row[3:]))
+            pages.setdefault(key, []).append(row[:2])
+    return pages
+
+
+def get_children_counts(model, parent_ids):
+    """
+    @return dict: parent id -> number of subpages of each page in
+        'parent_ids', computed with one grouped query.
+    """
+    if not parent_ids:
+        return {}
+
+    return dict(
+        (row['parent'], row['count']) for row in model.objects.filter(
+            parent__in=parent_ids
+        ).order_by().values('parent').annotate(count=Count('id'))
+    )
+
+
+def get_children(model, parent_ids):
+    """
+    @return dict: parent id -> list of (id, template key) of the subpages of
+        each page in 'parent_ids' in tree order, fetched with one query.
+    """
+    if not parent_ids:
+        return {}
+
+    children = {}
+    for pk, parent_id, template_key in model.objects.filter(
+        parent__in=parent_ids
+    ).order_by('tree_id', 'lft').values_list('pk', 'parent', 'template_key'):
+        children.setdefault(parent_id, []).append((pk, template_key))
+    return children
+
+
+def has_children_bounds(template):
+    return bool(
+        getattr(template, 'no_children', False) or
+        getattr(template, 'allowed_child_templates', None) is not None or
+        getattr(template, 'max_children', None) is not None
+    )
+
+
+def get_violations(model, candidates, max_level=None, scope=None):
+    """
+    Checks the bounds of each (template, instance, parent) tuple in
+    'candidates', 'instance' and 'parent' (page or page id) being optional.
+    Parents, unique templates and subpages are fetched with one query each
+    so the number of queries doesn't depend on the number of candidates.
+
+    @param max_level: max level of navigation allowed, None for no limit.
+    @param scope: dict field name -> value overriding the ones of the
+        instances when checking templates unique per those fields.
+    @return list: for each candidate, the list of exceptions describing
+        the bounds it doesn't respect.
+    """
+    candidates = list(candidates)
+    parents = get_parents(model, [parent for _, _, parent in candidates])
+
+    scopes = [
+        get_unique_scope(model, template, instance, scope)
+        for template, instance, _ in candidates
+    ]
+    unique_pages = get_unique_pages(model, [
+        (template.key, getattr(template, 'unique_per', ()), template_scope)
+        for (template, _, _), template_scope in zip(candidates, scopes)
+        if getattr(template, 'unique', False)
+    ])
+
+    # the subpages of the instances are fetched to report the offending
+    # ones, the parents checked for max_children only need a count
+    instance_ids = set()
+    parent_ids = set()
+    for (template, instance, _), parent in zip(candidates, parents):
+        if instance and instance.pk and has_children_bounds(template):
+            instance_ids.add(instance.pk)
+        if parent:
+            parent_template = get_template(model, parent)
+            if getattr(parent_template, 'max_children', None) is not None:
+                parent_ids.add(parent.pk)
+    all_children = get_children(model, instance_ids)
+    children_counts = dict(
+        (pk, len(children)) for pk, children in all_children.items()
+    )
+    children_counts.update(
+        get_children_counts(model, parent_ids - instance_ids)
+    )
+
+    violations = []
+    for (template, instance, _), parent, template_scope in zip(
+        candidates, parents, scopes
+    ):
+        exceptions = []
+        instance_id = instance.pk if instance else None
+
+        if getattr(template, 'unique', False):
+            conflicts = [
+                (pk, title) for pk, title in unique_pages.get(
+                    (template.key, template_scope), []
+                ) if pk != instance_id
+            ]
+            if conflicts:
+                exceptions.append(
+                    UniqueTemplateException(template.key, *conflicts[0])
+                )
+
+        # violations involving the parent point to it
+        on_parent = {}
+        if parent:
+            on_parent = {'page_id': parent.pk, 'page_title': parent.title}
+            parent_template = get_template(model, parent)
+
+            if getattr(template, 'first_level_only', False):
+                exceptions.append(
+                    FirstLevelOnlyTemplateException(template.key, **on_parent)
+                )
+
+            if getattr(parent_template, 'no_children', False):
+                exceptions.append(
+                    NoChildrenTemplateException(template.key, **on_parent)
+                )
+
+            allowed = getattr(template, 'allowed_parent_templates', None)
+            if allowed is not None and parent.template_key not in allowed:
+                exceptions.append(
+                    AllowedParentTemplatesException(template.key, **on_parent)
+                )
+
+            allowed = getattr(parent_template, 'allowed_child_templates', None)
+            if allowed is not None and template.key not in allowed:
+                exceptions.append(
+                    AllowedChildTemplatesException(template.key, **on_parent)
+                )
+
+            max_children = getattr(parent_template, 'max_children', None)
+            if max_children is not None:
+                siblings = children_counts.get(parent.pk, 0)
+                if instance and instance.parent_id == parent.pk:
+                    siblings -= 1
+                if siblings >= max_children:
+                    exceptions.append(
+                        MaxChildrenTemplateException(template.key, **on_parent)
+                    )
+
+        level = parent.level + 2 if parent else 1
+        template_max_level = getattr(template, 'max_level', None)
+        if template_max_level and level > template_max_level:
+            exceptions.append(
+                MaxLevelTemplateException(template.key, **on_parent)
+            )
+        if max_level and level > max_level:
+            exceptions.append(
+                NavigationLevelException(template.key, **on_parent)
+            )
+
+        children = all_children.get(instance_id, [])
+        if children:
+            if getattr(template, 'no_children', False):
+                exceptions.append(NoChildrenTemplateException(
+                    template.key, child_ids=[pk for pk, _ in children]
+                ))
+
+            max_children = getattr(template, 'max_children', None)
+            if max_children is not None and len(children) > max_children:
+                exceptions.append(MaxChildrenTemplateException(
+                    template.key,
+                    child_ids=[pk for pk, _ in children[max_children:]]
+                ))
+
+            allowed = getattr(template, 'allowed_child_templates', None)
+            if allowed is not None:
+                child_ids = [
+                    pk for pk, template_key in children
+                    if template_key not in allowed
+                ]
+                if child_ids:
+                    exceptions.append(AllowedChildTemplatesException(
+                        template.key, child_ids=child_ids
+                    ))
+
+        violations.append(exceptions)
+    return violations
+
+
+def audit_pages(model, pages, max_level=None):
+    """
+    Validates already saved 'pages' against the bounds of their templates.
+    The number of queries doesn't depend on the number of pages checked.
+
+    @param max_level: max level of navigation allowed, None for no limit.
+    @return list: (page, exception) tuples, one for each violation found.
+    """
+    pages = [page for page in pages if get_template(model, page)]
+    violations = get_violations(model, [
+        (get_template(model, page), page, page.parent_id) for page in pages
+    ], max_level=max_level)
+
+    return [
+        (page, exception)
+        for page, exceptions in zip(pages, violations)
+        for exception in exceptions
+    ]
+
+
+def get_affected_pages(model, template_keys):
+    """
+    @return list: pages using any of 'template_keys' together with their
+        parents and children, that is all the pages whose bounds may be
+        affected by a change in the definition of those templates.
+    """
+    template_keys = list(template_keys)
+    if not template_keys:
+        return []
+
+    pages = dict(
+        (page.pk, page) for page in model.objects.filter(
+            template_key__in=template_keys
+        )
+    )
+    for page in model.objects.filter(parent__template_key__in=template_keys):
+        pages[page.pk] = page
+
+    parent_ids = set(
+        page.parent_id for page in pages.values()
+        if page.parent_id and page.parent_id not in pages
+    )
+    if parent_ids:
+        for page in model.objects.filter(id__in=parent_ids):
+            pages[page.pk] = page
+
+    return sorted(pages.values(), key=lambda page: (page.tree_id, page.lft))
@@ -0,0 +1,27 @@
+from django.http import HttpResponse
+from django.utils.cache import patch_cache_control, patch_response_headers
+from django.views.static import serve
+
+from .metrics import CONTENT_TYPE, render
+from .thumbnails import get_thumbnail_root
+
+
+THUMBNAIL_CACHE_TIMEOUT = 60 * 60 * 24 * 365
+
+
+def metrics(request):
+    """
+    Exports the feincms-bounds metrics in the Prometheus text format.
+    """
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+def thumbnail(request, path):
+    """
+    Serves the thumbnails of the template preview images. Their names depend
+    on their content so they can be cached forever.
+    """
+    response = serve(request, path, document_root=get_thumbnail_root())
+    patch_response_headers(response, cache_timeout=THUMBNAIL_CACHE_TIMEOUT)
+    patch_cache_control(response, public=True)
+    return response
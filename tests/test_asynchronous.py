@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import mock
+
+from django.db import connections, DEFAULT_DB_ALIAS
+
+from feincms.module.page.models import Page
+
+from feincms_bounds import asynchronous
+from feincms_bounds.admin import check_template, get_valid_templates
+from feincms_bounds.asynchronous import acheck_template, \
+    aget_valid_templates, validate_checks, TemplateCheck, \
+    ValidTemplatesCheck
+from feincms_bounds.exceptions import BoundsException
+
+from .test_pages import TestBoundsBase
+
+
+class SharedConnectionWorker(asynchronous.Worker):
+    """
+    Worker using the connection of the test, which holds the test data in
+    its transaction.
+    """
+    def __init__(self):
+        super(SharedConnectionWorker, self).__init__()
+        self.connection = connections[DEFAULT_DB_ALIAS]
+
+    def run(self):
+        connections[DEFAULT_DB_ALIAS] = self.connection
+        super(SharedConnectionWorker, self).run()
+
+
+class TestAsynchronous(TestBoundsBase):
+    def setUp(self):
+        worker = SharedConnectionWorker()
+        worker.connection.allow_thread_sharing = True
+        self.addCleanup(
+            setattr, worker.connection, 'allow_thread_sharing', False
+        )
+        worker.start()
+        for patcher in (
+            mock.patch.object(asynchronous, '_worker', [worker]),
+            mock.patch.object(asynchronous, 'close_connection'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(asynchronous.shutdown)
+
+        self.templates = Page._feincms_templates.values()
+        self.home = self.create_page('Home', template_key='homepage')
+        self.parent = self.create_page('Parent')
+        self.child = self.create_page('Child', parent=self.parent)
+        self.set_bound('internalpage', max_children=1)
+
+        self.pages = [None, self.home, self.parent, self.child]
+
+    def check_template(self, template, **kwargs):
+        try:
+            check_template(Page, template, **kwargs)
+        except BoundsException as e:
+            return e.__class__, e.as_dict()
+
+    def acheck_template(self, result):
+        try:
+            result.get(timeout=10)
+        except BoundsException as e:
+            return e.__class__, e.as_dict()
+
+    def test_check_template(self):
+        candidates = [
+            dict(template=template, instance=instance, parent=parent)
+            for template in self.templates
+            for instance in self.pages
+            for parent in self.pages
+            if parent is None or parent != instance
+        ]
+
+        results = [
+            acheck_template(Page, **candidate) for candidate in candidates
+        ]
+        self.assertEqual(
+            [self.acheck_template(result) for result in results],
+            [self.check_template(**candidate) for candidate in candidates]
+        )
+
+    def test_get_valid_templates(self):
+        candidates = [
+            dict(instance=instance, parent=parent)
+            for instance in self.pages
+            for parent in self.pages
+            if parent is None or parent != instance
+        ]
+
+        results = [
+            aget_valid_templates(Page, **candidate)
+            for candidate in candidates
+        ]
+        self.assertEqual(
+            [result.get(timeout=10) for result in results],
+            [
+                get_valid_templates(Page, **candidate)
+                for candidate in candidates
+            ]
+        )
+
+    def test_callback(self):
+        results = []
+        result = acheck_template(
+            Page, Page._feincms_templates['homepage'], parent=self.parent
+        )
+        result.wait(10)
+        result.add_callback(results.append)
+
+        self.assertEqual(results, [result])
+        self.assertFalse(result.successful())
+
+    def test_batched(self):
+        # the checks of several pages are validated together, with the
+        # same queries as a single synchronous call
+        checks = [
+            ValidTemplatesCheck(Page, instance=page)
+            for page in (self.home, self.parent, self.child)
+        ] + [
+            TemplateCheck(Page, template, parent=self.parent.pk)
+            for template in self.templates
+        ]
+        with self.assertNumQueries(3):
+            validate_checks(checks)
+
+        for check in checks:
+            self.assertTrue(check.result.ready())
+
+    def test_callback_error(self):
+        results = []
+
+        def callback(result):
+            raise ValueError
+
+        checks = [
+            ValidTemplatesCheck(Page, instance=page)
+            for page in (self.home, self.parent)
+        ]
+        checks[0].result.add_callback(callback)
+        checks[1].result.add_callback(results.append)
+        with mock.patch.object(asynchronous.logger, 'exception') as exception:
+            validate_checks(checks)
+
+        self.assertTrue(exception.called)
+        self.assertEqual(results, [checks[1].result])
+        self.assertTrue(checks[0].result.successful())
+
+    def test_finish_error(self):
+        checks = [
+            TemplateCheck(Page, template, parent=self.parent)
+            for template in self.templates
+        ]
+        with mock.patch.object(
+            TemplateCheck, 'finish', side_effect=ValueError
+        ):
+            with mock.patch.object(asynchronous.logger, 'exception'):
+                validate_checks(checks)
+
+        for check in checks:
+            self.assertRaises(ValueError, check.result.get, 0)
+
+    def test_worker_survives_errors(self):
+        with mock.patch.object(
+            asynchronous, 'validate_checks', side_effect=ValueError
+        ):
+            with mock.patch.object(asynchronous.logger, 'exception'):
+                result = aget_valid_templates(Page)
+                self.assertRaises(ValueError, result.get, 10)
+
+        worker = asynchronous.get_worker()
+        self.assertTrue(worker.is_alive())
+        self.assertEqual(
+            aget_valid_templates(Page).get(timeout=10),
+            get_valid_templates(Page)
+        )
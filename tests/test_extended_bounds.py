@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from django.contrib.auth.models import User
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.admin import check_template, get_valid_templates
+from feincms_bounds.exceptions import MaxChildrenTemplateException, \
+    AllowedParentTemplatesException, AllowedChildTemplatesException, \
+    MaxLevelTemplateException
+from feincms_bounds.validation import audit_pages
+
+from .test_pages import TestBoundsBase
+
+
+class TestExtendedBounds(TestBoundsBase):
+    def setUp(self):
+        self.internalpage = Page._feincms_templates['internalpage']
+        self.parent = self.create_page('Parent')
+        self.child = self.create_page('Child', parent=self.parent)
+
+    def test_max_children(self):
+        self.set_bound('internalpage', max_children=1)
+
+        self.assertRaises(
+            MaxChildrenTemplateException, check_template,
+            Page, self.internalpage, parent=self.parent
+        )
+        # moving the existing child under the same parent is fine
+        check_template(
+            Page, self.internalpage, instance=self.child, parent=self.parent
+        )
+
+        self.create_page('Second child', parent=self.parent)
+        violations = audit_pages(Page, [self.parent])
+        self.assertEqual(
+            [(page.pk, e.__class__) for page, e in violations],
+            [(self.parent.pk, MaxChildrenTemplateException)]
+        )
+
+    def test_allowed_parent_templates(self):
+        self.set_bound('internalpage', allowed_parent_templates=['homepage'])
+
+        self.assertRaises(
+            AllowedParentTemplatesException, check_template,
+            Page, self.internalpage, parent=self.parent.pk
+        )
+        check_template(Page, self.internalpage)
+
+    def test_allowed_child_templates(self):
+        self.set_bound('internalpage', allowed_child_templates=['homepage'])
+
+        self.assertRaises(
+            AllowedChildTemplatesException, check_template,
+            Page, self.internalpage, parent=self.parent
+        )
+        self.assertRaises(
+            AllowedChildTemplatesException, check_template,
+            Page, self.internalpage, instance=self.parent
+        )
+
+    def test_max_level(self):
+        self.set_bound('internalpage', max_level=2)
+
+        check_template(Page, self.internalpage, parent=self.parent)
+        self.assertRaises(
+            MaxLevelTemplateException, check_template,
+            Page, self.internalpage, parent=self.child
+        )
+
+    def test_valid_templates_queries(self):
+        self.set_bound('internalpage', max_children=5)
+
+        # parent, unique templates and subpages: one query each
+        with self.assertNumQueries(3):
+            templates = get_valid_templates(Page, parent=self.parent.pk)
+        self.assertEqual(templates.keys(), ['internalpage'])
+
+    def test_missing_parent(self):
+        self.assertRaises(
+            Page.DoesNotExist, check_template,
+            Page, self.internalpage, parent=self.child.pk + 1
+        )
+
+    def test_changelist_add_icon(self):
+        User.objects.create_superuser('admin', 'admin@example.com', 'admin')
+        self.assertTrue(
+            self.client.login(username='admin', password='admin')
+        )
+        self.set_bound('internalpage', max_children=1)
+
+        response = self.client.get('/admin/page/page/')
+        pages = dict(
+            (page.pk, page)
+            for page in response.context_data['cl'].result_list
+        )
+        self.assertFalse(pages[self.parent.pk].bounds_can_add_children)
+        self.assertTrue(pages[self.child.pk].bounds_can_add_children)
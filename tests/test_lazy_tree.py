@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import json
+
+import mock
+
+from django.test.utils import override_settings
+
+from feincms.module.page.models import Page
+
+from .test_pages import TestPagesBase
+
+
+@override_settings(FEINCMS_BOUNDS_LAZY_TREE_LEVELS=1)
+class TestLazyTree(TestPagesBase):
+    def setUp(self):
+        super(TestLazyTree, self).setUp()
+        self.login()
+
+        self.create_page(title='Root', slug='root')
+        self.root = Page.objects.get(slug='root')
+        self.create_page(title='Child', slug='child', parent=self.root.pk)
+        self.child = Page.objects.get(slug='child')
+        self.create_page(
+            title='Grandchild', slug='grandchild', parent=self.child.pk
+        )
+
+    def test_changelist(self):
+        response = self.client.get('/admin/page/page/')
+
+        self.assertEqual(
+            [page.pk for page in response.context_data['cl'].result_list],
+            [self.root.pk]
+        )
+        self.assertEqual(
+            json.loads(response.context_data['tree_structure']),
+            {str(self.root.pk): []}
+        )
+        self.assertEqual(
+            response.context_data['lazy_nodes'], '[%d]' % self.root.pk
+        )
+        self.assertTrue('feincms_bounds/js/lazy_tree.js' in response.content)
+
+        # filtered lists are complete
+        response = self.client.get('/admin/page/page/?active__exact=0')
+        self.assertEqual(len(response.context_data['cl'].result_list), 3)
+
+    def test_subpages(self):
+        with mock.patch(
+            'feincms_bounds.admin.django_settings'
+        ) as dj_settings:
+            dj_settings.FEINCMS_NAVIGATION_LEVEL = 2
+            dj_settings.FEINCMS_BOUNDS_LAZY_TREE_LEVELS = 1
+            response = self.client.get(
+                '/admin/page/page/%d/subpages/' % self.root.pk
+            )
+
+        data = json.loads(response.content)
+        self.assertEqual(data['subpages'], [self.child.pk])
+        self.assertEqual(data['lazy_nodes'], [self.child.pk])
+        bounds = data['bounds'][str(self.child.pk)]
+        self.assertFalse(bounds['can_add_children'])
+        self.assertEqual(bounds['allowed_templates'], [])
+        self.assertEqual(bounds['violations']['internalpage'], [{
+            'rule': 'navigation_level',
+            'template': 'internalpage',
+            'page': {
+                'id': self.child.pk, 'title': 'Child',
+                'url': '/admin/page/page/%d/' % self.child.pk
+            },
+            'children': [],
+        }])
+        self.assertEqual(len(data['rows']), 1)
+        self.assertTrue('page_marker-%d' % self.child.pk in data['rows'][0])
+        self.assertTrue('actions_placeholder.gif' in data['rows'][0])
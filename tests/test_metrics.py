@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import mock
+
+from django.test.utils import override_settings
+
+from feincms.module.page.models import Page
+
+from feincms_bounds import metrics
+from feincms_bounds.admin import get_valid_templates
+
+from .test_pages import TestPagesBase
+
+
+class TestMetrics(TestPagesBase):
+    def setUp(self):
+        super(TestMetrics, self).setUp()
+        metrics.reset()
+
+    def test_rejections(self):
+        self.login()
+
+        self.create_page(
+            title='Home Page', slug='homepage', template_key='homepage'
+        )
+        homepage = Page.objects.get(slug='homepage')
+        self.create_page(title='Test', slug='test', parent=homepage.pk)
+
+        response = self.client.get('/metrics/bounds/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        self.assertTrue(
+            'feincms_bounds_rejections_total'
+            '{rule="no_children",template="internalpage"} 1' in response.content
+        )
+        self.assertTrue(
+            'feincms_bounds_validation_duration_seconds_count'
+            '{function="check_template"} 1' in response.content
+        )
+        self.assertTrue(
+            'feincms_bounds_validation_duration_seconds_count'
+            '{function="get_valid_templates"}' in response.content
+        )
+        self.assertTrue(
+            'feincms_bounds_move_node_errors_total 0' in response.content
+        )
+
+    def test_move_node_errors(self):
+        self.login()
+
+        self.create_page(title='First', slug='first')
+        self.create_page(title='Second', slug='second')
+        first, second = Page.objects.all()
+
+        with mock.patch(
+            'feincms_bounds.admin.check_template', side_effect=ValueError
+        ):
+            response = self.client.post('/admin/page/page/', {
+                '__cmd': 'move_node', 'position': 'last-child',
+                'cut_item': second.pk, 'pasted_on': first.pk,
+            }, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+        self.assertEqual(response.content, 'Server Error.')
+        self.assertEqual(metrics.MOVE_NODE_ERRORS.values, {(): 1})
+        self.assertEqual(metrics.REJECTIONS.values, {})
+
+    @override_settings(
+        FEINCMS_BOUNDS_METRICS_FILE='/nonexistent/dir/bounds.prom'
+    )
+    def test_write_error(self):
+        with mock.patch.object(metrics, '_last_write', [0]):
+            with mock.patch.object(metrics.logger, 'exception') as exception:
+                templates = get_valid_templates(Page)
+
+        self.assertEqual(len(templates), len(Page._feincms_templates))
+        self.assertTrue(exception.called)
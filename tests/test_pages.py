@@ -43,6 +43,23 @@ class TestPagesBase(TestCase):
         return self.client.post('/admin/page/page/add/', dic)
 
 
+class TestBoundsBase(TestCase):
+    """
+    Creates the pages directly, without going through the admin.
+    """
+    def create_page(self, title, template_key='internalpage', parent=None):
+        return Page.objects.create(
+            title=title, slug=title.lower(), template_key=template_key,
+            parent=parent
+        )
+
+    def set_bound(self, template_key, **bounds):
+        template = Page._feincms_templates[template_key]
+        patcher = mock.patch.multiple(template, **bounds)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+
 class TestMaxNavigationLevel(TestPagesBase):
 
     def test_max_3(self):
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+from StringIO import StringIO
+
+from django.core.management import call_command
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.repair import plan_repairs, update_cached_urls, \
+    UNPUBLISH
+from feincms_bounds.validation import audit_pages
+
+from .test_pages import TestBoundsBase
+
+
+class TestRepairCommand(TestBoundsBase):
+    def setUp(self):
+        self.root = self.create_page('Root')
+        self.homepage = self.create_page(
+            'Home', template_key='homepage', parent=self.root
+        )
+        self.child = self.create_page('Child', parent=self.homepage)
+
+    def repair(self, *strategies, **options):
+        stdout = StringIO()
+        call_command(
+            'bounds_repair', strategies=list(strategies), stdout=stdout,
+            **options
+        )
+        return stdout.getvalue()
+
+    def test_dry_run(self):
+        output = self.repair('no_children=reparent')
+        self.assertTrue('reparent under page %s' % self.root.pk in output)
+        self.assertTrue('1 changes planned' in output)
+
+        self.assertEqual(
+            Page.objects.get(pk=self.child.pk).parent_id, self.homepage.pk
+        )
+
+    def test_apply(self):
+        output = self.repair(
+            'no_children=reparent', 'first_level_only=unpublish', apply=True
+        )
+        self.assertTrue('2 changes applied' in output)
+        # the unpublished homepage is still under the root page
+        self.assertTrue(
+            'Page %s "Home" (first_level_only): still invalid' %
+            self.homepage.pk in output
+        )
+        self.assertTrue('1 violations left' in output)
+
+        child = Page.objects.get(pk=self.child.pk)
+        self.assertEqual(child.parent_id, self.root.pk)
+        self.assertEqual(child.level, 1)
+        self.assertEqual(child._cached_url, '/root/child/')
+        self.assertFalse(Page.objects.get(pk=self.homepage.pk).active)
+
+        root = Page.objects.get(pk=self.root.pk)
+        self.assertEqual((root.lft, root.rght), (1, 6))
+        self.assertEqual(
+            sorted(p.pk for p in root.get_children()),
+            [self.homepage.pk, self.child.pk]
+        )
+
+    def test_reassign_unique(self):
+        second = self.create_page('Second home', template_key='homepage')
+
+        self.repair(
+            'unique=reassign', fallback_template='internalpage', apply=True
+        )
+        self.assertEqual(
+            Page.objects.get(pk=self.homepage.pk).template_key, 'homepage'
+        )
+        self.assertEqual(
+            Page.objects.get(pk=second.pk).template_key, 'internalpage'
+        )
+
+    def test_reparent_first_level(self):
+        self.repair('first_level_only=reparent', apply=True)
+
+        homepage = Page.objects.get(pk=self.homepage.pk)
+        self.assertEqual(homepage.parent_id, None)
+        self.assertNotEqual(homepage.tree_id, self.root.tree_id)
+        self.assertEqual((homepage.lft, homepage.rght), (1, 4))
+
+        child = Page.objects.get(pk=self.child.pk)
+        self.assertEqual(child.tree_id, homepage.tree_id)
+        self.assertEqual(child._cached_url, '/home/child/')
+
+    def test_max_children_over_limit_twice(self):
+        # First is both a subpage of Root and a page with too many subpages
+        self.set_bound('internalpage', max_children=2)
+        Page.objects.filter(pk=self.homepage.pk).delete()
+        root = Page.objects.get(pk=self.root.pk)
+        first = self.create_page('First', parent=root)
+        second = self.create_page('Second', parent=root)
+        third = self.create_page('Third', parent=root)
+        children = [
+            self.create_page('Sub %d' % i, parent=first) for i in range(3)
+        ]
+
+        actions, skipped = plan_repairs(
+            Page, audit_pages(Page, Page.objects.all()),
+            {'max_children': UNPUBLISH}
+        )
+        self.assertEqual(
+            sorted(page.pk for page, _, _, _ in actions),
+            sorted([third.pk, children[2].pk])
+        )
+        self.assertTrue(second.pk not in [page.pk for page, _, _ in skipped])
+
+    def test_cached_urls_batched(self):
+        for i in range(3):
+            self.create_page('Sub%d' % i, parent=self.homepage)
+
+        # one select, updates are only run for the changed urls
+        with self.assertNumQueries(1):
+            update_cached_urls(Page, self.root.tree_id)
+
+        Page.objects.filter(parent=self.homepage).update(_cached_url='')
+        with self.assertNumQueries(3):
+            update_cached_urls(Page, self.root.tree_id, batch_size=2)
+        self.assertEqual(
+            sorted(Page.objects.filter(parent=self.homepage).values_list(
+                '_cached_url', flat=True
+            )),
+            ['/root/home/child/', '/root/home/sub0/', '/root/home/sub1/',
+             '/root/home/sub2/']
+        )
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from django.core.management import call_command
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.exceptions import UniqueTemplateException
+from feincms_bounds.validation import audit_pages, get_affected_pages
+
+from .test_pages import TestBoundsBase
+
+
+class TestAuditPages(TestBoundsBase):
+    def test_unique_changed(self):
+        self.create_page('First')
+        self.create_page('Second')
+        self.assertEqual(audit_pages(Page, Page.objects.all()), [])
+
+        self.set_bound('internalpage', unique=True)
+        violations = audit_pages(Page, Page.objects.all())
+        self.assertEqual(len(violations), 2)
+        for page, exception in violations:
+            self.assertTrue(isinstance(exception, UniqueTemplateException))
+
+    def test_affected_pages(self):
+        parent = self.create_page('Parent')
+        page = self.create_page('Page', template_key='homepage', parent=parent)
+        child = self.create_page('Child', parent=page)
+        self.create_page('Other')
+
+        self.assertEqual(
+            [p.pk for p in get_affected_pages(Page, ['homepage'])],
+            [parent.pk, page.pk, child.pk]
+        )
+
+
+class TestRevalidateCommand(TestBoundsBase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        self.path = os.path.join(self.tmp_dir, 'fingerprint.json')
+
+    def revalidate(self, **options):
+        stdout = StringIO()
+        call_command(
+            'bounds_revalidate', fingerprint_file=self.path, stdout=stdout,
+            **options
+        )
+        return stdout.getvalue()
+
+    def test_only_changed_templates(self):
+        parent = self.create_page('Parent')
+        self.create_page('Child', parent=parent)
+
+        output = self.revalidate(save=True)
+        self.assertTrue('0 violations found' in output)
+        self.assertTrue(os.path.exists(self.path))
+
+        output = self.revalidate()
+        self.assertTrue('No template bounds have changed' in output)
+
+        self.set_bound('internalpage', no_children=True)
+        output = self.revalidate()
+        self.assertTrue('Templates changed: internalpage' in output)
+        self.assertTrue('2 pages checked, 2 violations found' in output)
+
+    def test_conflicting_page(self):
+        first = self.create_page('First')
+        second = self.create_page('Second')
+        self.set_bound('internalpage', unique=True)
+
+        output = self.revalidate()
+        self.assertTrue(
+            u'Page %s "Second" (internalpage): template already used '
+            u'somewhere else, conflicting page %s "First"' % (
+                second.pk, first.pk
+            ) in output
+        )
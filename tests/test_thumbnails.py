@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from feincms.module.page.models import Page
+
+from feincms_bounds import thumbnails
+
+from .test_pages import TestPagesBase
+
+
+class TestThumbnails(TestPagesBase):
+    def setUp(self):
+        super(TestThumbnails, self).setUp()
+
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir)
+        thumbnails.Image.new('RGB', (800, 600)).save(
+            os.path.join(self.tmp_dir, 'home.png')
+        )
+
+        settings_override = override_settings(
+            MEDIA_ROOT=self.tmp_dir, MEDIA_URL='/media/',
+            FEINCMS_BOUNDS_THUMBNAIL_ROOT=os.path.join(
+                self.tmp_dir, 'thumbnails'
+            ),
+            FEINCMS_BOUNDS_THUMBNAIL_URL='/thumbnails/'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        patcher = mock.patch.object(
+            Page._feincms_templates['homepage'], 'preview_image',
+            '/media/home.png'
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        thumbnails.clear_cache()
+        self.addCleanup(thumbnails.clear_cache)
+
+    def test_change_form(self):
+        self.login()
+
+        response = self.client.get('/admin/page/page/add/')
+        url, width, height = thumbnails.get_thumbnail(
+            Page._feincms_templates['homepage']
+        )
+        self.assertEqual((width, height), (120, 90))
+        self.assertTrue(url.startswith('/thumbnails/'))
+        self.assertTrue(
+            '<img src="%s" width="120" height="90" alt="homepage" />' % url
+            in response.content
+        )
+        self.assertFalse('/media/home.png' in response.content)
+
+    def test_command(self):
+        stdout = StringIO()
+        call_command('bounds_thumbnails', stdout=stdout)
+
+        name = os.listdir(os.path.join(self.tmp_dir, 'thumbnails'))[0]
+        self.assertEqual(
+            stdout.getvalue(), 'homepage: /thumbnails/%s (120x90)\n' % name
+        )
+
+    def test_view(self):
+        url, width, height = thumbnails.get_thumbnail(
+            Page._feincms_templates['homepage']
+        )
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue('max-age=31536000' in response['Cache-Control'])
+        self.assertTrue('public' in response['Cache-Control'])
+
+    def test_invalid_image(self):
+        self.login()
+        with open(os.path.join(self.tmp_dir, 'home.png'), 'w') as f:
+            f.write('not an image')
+
+        with mock.patch.object(thumbnails.logger, 'exception') as exception:
+            response = self.client.get('/admin/page/page/add/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(exception.called)
+        self.assertTrue(
+            '<img src="/media/home.png" alt="homepage" />' in response.content
+        )
+        self.assertEqual(
+            thumbnails.get_thumbnail(Page._feincms_templates['homepage']),
+            None
+        )
+
+    def test_no_root(self):
+        self.login()
+
+        with override_settings(
+            STATIC_ROOT=None, FEINCMS_BOUNDS_THUMBNAIL_ROOT=None
+        ):
+            response = self.client.get('/admin/page/page/add/')
+            self.assertRaises(
+                CommandError, call_command, 'bounds_thumbnails',
+                stdout=StringIO()
+            )
+        self.assertTrue(
+            '<img src="/media/home.png" alt="homepage" />' in response.content
+        )
+        self.assertFalse(
+            os.path.exists(os.path.join(self.tmp_dir, 'thumbnails'))
+        )
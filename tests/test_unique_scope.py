@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import mock
+
+from django.db import connection
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.admin import check_template
+from feincms_bounds.exceptions import UniqueTemplateException
+from feincms_bounds.indexes import get_indexes, create_index
+from feincms_bounds.validation import get_unique_pages_queryset
+
+from .test_pages import TestPagesBase, TestBoundsBase
+
+
+class TestUniqueScope(TestBoundsBase):
+    def setUp(self):
+        self.set_bound('homepage', unique_per=('site', 'language'))
+        self.homepage = Page._feincms_templates['homepage']
+        Page.objects.create(
+            title='Home', slug='home', template_key='homepage', language='en'
+        )
+
+    def test_scoped(self):
+        self.assertRaises(
+            UniqueTemplateException, check_template, Page, self.homepage,
+            scope={'language': 'en'}
+        )
+        check_template(Page, self.homepage, scope={'language': 'de'})
+
+        # one indexed lookup
+        with self.assertNumQueries(1):
+            check_template(Page, self.homepage, scope={'language': 'de'})
+
+
+class TestUniqueScopeIndex(TestBoundsBase):
+    def test_index(self):
+        self.set_bound('homepage', unique_per=('site', 'language'))
+
+        table = Page._meta.db_table
+        name, fields = get_indexes(Page)[-1]
+        self.assertEqual(
+            name, '%s_bounds_site_language_template_key' % table
+        )
+        self.assertEqual(fields, ['site', 'language', 'template_key'])
+
+        self.assertTrue(create_index(Page, name, fields))
+        self.assertFalse(create_index(Page, name, fields))
+
+        cursor = connection.cursor()
+        sql, params = Page.objects.filter(
+            site=1, language='en', template_key='homepage'
+        ).values('id').query.sql_with_params()
+        cursor.execute('EXPLAIN QUERY PLAN %s' % sql, params)
+        self.assertTrue(name in ' '.join(
+            unicode(column) for row in cursor.fetchall() for column in row
+        ))
+
+        # the pages before each one are counted with the index too
+        sql, params = get_unique_pages_queryset(
+            Page, ('site', 'language'), [('homepage', (1, 'en'))]
+        ).values('id').query.sql_with_params()
+        cursor.execute('EXPLAIN QUERY PLAN %s' % sql, params)
+        plan = [
+            ' '.join(unicode(column) for column in row)
+            for row in cursor.fetchall()
+        ]
+        self.assertTrue([
+            step for step in plan if 'previous' in step and name in step
+        ], plan)
+
+
+class TestUniqueScopeAdmin(TestPagesBase):
+    def setUp(self):
+        super(TestUniqueScopeAdmin, self).setUp()
+        patcher = mock.patch.object(
+            Page._feincms_templates['homepage'], 'unique_per',
+            ('site', 'language')
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.login()
+
+    def get_template_choices(self, language):
+        response = self.client.get(
+            '/admin/page/page/add/?language=%s' % language
+        )
+        form = response.context_data['adminform'].form
+        return [key for key, _ in form.fields['template_key'].choices]
+
+    def test_one_homepage_per_language(self):
+
+        self.create_page(
+            title='Home Page', slug='homepage', template_key='homepage'
+        )
+        self.create_page(
+            title='Startseite', slug='startseite', template_key='homepage',
+            language='de'
+        )
+        self.assertEqual(Page.objects.count(), 2)
+
+        response = self.create_page(
+            title='Home Page2', slug='homepage2', template_key='homepage'
+        )
+        form = response.context_data['adminform'].form
+        self.assertEqual(form.errors, {
+            'template_key': [
+                u'Select a valid choice. homepage is not one of the '
+                u'available choices.'
+            ]
+        })
+        self.assertEqual(Page.objects.count(), 2)
+
+    def test_add_form_choices(self):
+        self.create_page(
+            title='Home Page', slug='homepage', template_key='homepage'
+        )
+
+        self.assertFalse('homepage' in self.get_template_choices('en'))
+        self.assertTrue('homepage' in self.get_template_choices('de'))
@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+import mock
+
+from feincms.module.page.models import Page
+
+from feincms_bounds.exceptions import UniqueTemplateException, \
+    FirstLevelOnlyTemplateException, NoChildrenTemplateException, \
+    MaxChildrenTemplateException, AllowedChildTemplatesException
+from feincms_bounds import validation
+from feincms_bounds.validation import get_violations, get_unique_pages
+
+from .test_pages import TestBoundsBase
+
+
+class TestViolations(TestBoundsBase):
+    def setUp(self):
+        self.internalpage = Page._feincms_templates['internalpage']
+        self.homepage = Page._feincms_templates['homepage']
+
+    def test_unique(self):
+        home = self.create_page('Home', template_key='homepage')
+
+        with self.assertNumQueries(1):
+            violations = get_violations(Page, [(self.homepage, None, None)])
+        exception, = violations[0]
+        self.assertTrue(isinstance(exception, UniqueTemplateException))
+        self.assertEqual(exception.as_dict(), {
+            'rule': 'unique',
+            'template': 'homepage',
+            'page': {'id': home.pk, 'title': 'Home'},
+            'children': [],
+        })
+
+        # the page itself is not a conflict
+        self.assertEqual(
+            get_violations(Page, [(self.homepage, home, None)]), [[]]
+        )
+
+    def test_parent(self):
+        parent = self.create_page('Parent', template_key='homepage')
+
+        exceptions = get_violations(Page, [(self.homepage, None, parent)])[0]
+        self.assertEqual(
+            [e.__class__ for e in exceptions],
+            [
+                UniqueTemplateException, FirstLevelOnlyTemplateException,
+                NoChildrenTemplateException
+            ]
+        )
+        for exception in exceptions:
+            self.assertEqual(exception.template_key, 'homepage')
+            self.assertEqual(exception.page_id, parent.pk)
+            self.assertEqual(exception.page_title, 'Parent')
+
+    def test_children(self):
+        parent = self.create_page('Parent')
+        first = self.create_page('First', parent=parent)
+        second = self.create_page('Second', template_key='homepage',
+                                  parent=parent)
+        self.set_bound(
+            'internalpage', no_children=True, max_children=1,
+            allowed_child_templates=['internalpage']
+        )
+
+        with self.assertNumQueries(1):
+            exceptions = get_violations(
+                Page, [(self.internalpage, parent, None)]
+            )[0]
+        self.assertEqual(
+            [(e.__class__, e.child_ids, e.page_id) for e in exceptions],
+            [
+                (NoChildrenTemplateException, [first.pk, second.pk], None),
+                (MaxChildrenTemplateException, [second.pk], None),
+                (AllowedChildTemplatesException, [second.pk], None),
+            ]
+        )
+
+    def test_unique_pages_bounded(self):
+        pages = [
+            self.create_page('Home %d' % i, template_key='homepage')
+            for i in range(4)
+        ]
+
+        self.assertEqual(
+            get_unique_pages(Page, [('homepage', (), ())]),
+            {('homepage', ()): [
+                (pages[0].pk, 'Home 0'), (pages[1].pk, 'Home 1')
+            ]}
+        )
+        # the first page conflicts with the second one
+        exception, = get_violations(Page, [(self.homepage, pages[0], None)])[0]
+        self.assertEqual(exception.page_id, pages[1].pk)
+
+    def test_max_children_count(self):
+        parent = self.create_page('Parent')
+        for i in range(3):
+            self.create_page('Child %d' % i, parent=parent)
+        self.set_bound('internalpage', max_children=3)
+
+        # the subpages of a parent are only counted
+        with mock.patch.object(
+            validation, 'get_children', wraps=validation.get_children
+        ) as get_children:
+            with self.assertNumQueries(1):
+                exception, = get_violations(
+                    Page, [(self.internalpage, None, parent)]
+                )[0]
+        get_children.assert_called_once_with(Page, set())
+        self.assertTrue(isinstance(exception, MaxChildrenTemplateException))
+        self.assertEqual(exception.page_id, parent.pk)
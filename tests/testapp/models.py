@@ -26,4 +26,9 @@ Page.register_templates(
     )
 )
 
+Page.register_extensions(
+    'feincms.module.page.extensions.sites',
+    'feincms.module.extensions.translations',
+)
+
 Page.create_content_type(RawContent)
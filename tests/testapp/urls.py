@@ -13,6 +13,9 @@ urlpatterns = patterns('',
     url(r'^media/(?P<path>.*)$', 'django.views.static.serve',
         {'document_root': os.path.join(os.path.dirname(__file__), 'media/')}),
 
+    url(r'^metrics/bounds/$', 'feincms_bounds.views.metrics'),
+    url(r'^thumbnails/(?P<path>.*)$', 'feincms_bounds.views.thumbnail'),
+
     url(r'', include('feincms.contrib.preview.urls')),
     url(r'', include('feincms.views.cbv.urls')),
 )